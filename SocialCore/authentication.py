@@ -0,0 +1,164 @@
+"""
+JWT authentication backed by an in-process user cache.
+
+simplejwt's `JWTAuthentication` loads the user row on every request just to
+attach `request.user`. `CachedJWTAuthentication` keeps the minimal profile
+needed for authentication (id, email, is_active) in a bounded LRU cache whose
+entries expire after `AUTH_USER_CACHE_TTL` seconds, so the hot path does not
+query the database.
+
+Entries are dropped when a user is saved or deleted in this process (see
+`SocialCore.signals`); changes made by other processes, or by queryset
+`update()` calls that send no signals, are picked up when the entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .instrumentation import timed
+from .revocation import revocation_list
+
+User = get_user_model()
+
+# In the order of the model's fields, as `Model.from_db` expects
+PROFILE_FIELDS = ('id', 'email', 'is_active')
+
+
+class TTLLRUCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time to live.
+
+    Attributes:
+        maxsize (int): Maximum number of entries; 0 disables the cache.
+        ttl (float): Seconds an entry stays valid.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found or expired.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the value cached under `key`, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """
+        Caches `value` under `key`, evicting the least recently used entry when full.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Drops the entry cached under `key`, if any.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the size and hit and miss counters of the cache.
+        """
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = TTLLRUCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def invalidate_user(user_id):
+    """
+    Drops the cached profile of a user, so the next request reloads it.
+    """
+    user_cache.delete(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that reads the user's profile from `user_cache`.
+
+    The returned user only has the profile fields loaded; other fields are
+    deferred and loaded from the database on first access. Tokens revoked
+    through `SocialCore.revocation` are rejected.
+    """
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def get_validated_token(self, raw_token):
+        """
+        Validates a token, rejecting it if it has been revoked.
+
+        Raises:
+            InvalidToken: If the token is invalid, expired or revoked.
+        """
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_list.is_revoked(validated_token.get(api_settings.JTI_CLAIM, '')):
+            raise InvalidToken(_("Token has been revoked"))
+        return validated_token
+
+    def get_user(self, validated_token):
+        """
+        Returns the user of a validated token, from the cache when possible.
+
+        Raises:
+            InvalidToken: If the token has no user ID claim.
+            AuthenticationFailed: If the user does not exist or is inactive.
+        """
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the password hash, which is not cached
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        profile = user_cache.get(user_id)
+        if profile is None:
+            profile = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*PROFILE_FIELDS).first()
+            if profile is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, profile)
+
+        user = User.from_db('default', PROFILE_FIELDS, profile)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,62 @@
+"""
+Cache backends for state shared by the worker processes of one host.
+
+Django's `FileBasedCache` is visible to every process on the host, but its
+`add` checks for the key before writing it and its `incr` reads the value
+before writing the sum, so two processes can both add the same key or lose
+one of two increments. `AtomicFileBasedCache` runs both under an exclusive
+lock on a file in the cache directory, making them safe for sequence numbers
+and counters.
+"""
+import os
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+
+class AtomicFileBasedCache(FileBasedCache):
+    """
+    `FileBasedCache` whose `add`, `incr` and `decr` are atomic across processes and threads.
+
+    Plain `set` and `get` take no lock, as in `FileBasedCache`, since their
+    files are replaced with an atomic rename. `incr` keeps the expiry of the
+    key, where `FileBasedCache` resets it to the default timeout.
+    """
+    lock_filename = '.lock'
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        # Opened anew on every call: flock() locks exclude other open files, including in this process
+        with open(os.path.join(self._dir, self.lock_filename), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._locked():
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                expiry = value = None
+            now = time.time()
+            if value is None or (expiry is not None and expiry < now):
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            # Unlike BaseCache.incr, keeps the key's expiry instead of resetting it to the default timeout
+            self.set(key, value, timeout=None if expiry is None else expiry - now, version=version)
+            return value
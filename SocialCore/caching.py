@@ -0,0 +1,115 @@
+"""
+Response cache for friend lists.
+
+Rendered friend list responses are cached per user under a version number.
+Invalidation bumps the user's version instead of deleting keys, which orphans
+every cached page at once; orphaned entries expire with
+`FRIEND_LIST_CACHE_TIMEOUT`. The friend counts of the listed users are
+cached with the page, so they may lag by up to that timeout. The cache alias is set by `FRIEND_LIST_CACHE`
+and can point at any Django cache backend (local memory, file based, Redis);
+an empty alias disables the cache.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class FriendListCache:
+    """
+    Versioned cache of rendered friend list responses.
+
+    Attributes:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to be computed.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'FRIEND_LIST_CACHE', '')
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _version_key(user_id):
+        return f'friend-list-version:{user_id}'
+
+    def get_version(self, user_id):
+        """
+        Returns the current friend list version of a user.
+
+        A missing version is initialised from the clock rather than a constant,
+        so a version evicted from the cache never reuses the number of entries
+        cached before the eviction.
+        """
+        key = self._version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, time.time_ns(), timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    def _key(self, request):
+        digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return f'friend-list:{request.user.pk}:{self.get_version(request.user.pk)}:{digest}'
+
+    def get(self, request):
+        """
+        Returns the cached response body for a friend list request, and the key to cache it under on a miss.
+
+        The key holds the user's version as read here, before the list is
+        queried. A page computed after an invalidation that landed during the
+        query is then cached under the old version, where it is never read.
+
+        Args:
+            request (Request): The friend list request; its full URL is part of the key.
+
+        Returns:
+            tuple: The rendered JSON body, or None on a miss, and the key to
+            pass to `set`. Both are None when the cache is disabled.
+        """
+        if self.cache is None:
+            return None, None
+        key = self._key(request)
+        content = self.cache.get(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content, key
+
+    def set(self, key, content):
+        """
+        Caches the rendered JSON body of a friend list response under the key returned by `get`.
+        """
+        if self.cache is not None and key is not None:
+            self.cache.set(key, content, timeout=settings.FRIEND_LIST_CACHE_TIMEOUT)
+
+    def invalidate(self, *user_ids):
+        """
+        Invalidates every cached friend list page of the given users.
+        """
+        if self.cache is None:
+            return
+        for user_id in user_ids:
+            try:
+                self.cache.incr(self._version_key(user_id))
+            except ValueError:
+                self.cache.set(self._version_key(user_id), time.time_ns(), timeout=None)
+
+    def stats(self):
+        """
+        Returns the hit and miss counters of this process.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+friend_list_cache = FriendListCache()
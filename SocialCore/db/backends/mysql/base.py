@@ -0,0 +1,42 @@
+"""
+MySQL backend that checks connections out of an in-process pool.
+
+Enable it with `'ENGINE': 'SocialCore.db.backends.mysql'` and configure the
+pool with a `POOL` dict in the database settings (`SIZE`, `MAX_OVERFLOW`,
+`TIMEOUT`, `RECYCLE`). Django closes connections at the end of each request
+when `CONN_MAX_AGE` is 0, which here returns them to the pool instead.
+"""
+from django.db.backends.mysql import base
+
+from ...pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(self.alias, lambda: ConnectionPool(
+            connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            is_usable=self._ping,
+            size=options.get('SIZE', 5),
+            max_overflow=options.get('MAX_OVERFLOW', 10),
+            timeout=options.get('TIMEOUT', 30),
+            recycle=options.get('RECYCLE', 3600),
+        ))
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.get_pool(conn_params)
+        return self._pool.acquire()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.release(self.connection, discard=self.errors_occurred)
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            connection.ping()
+        except base.Database.Error:
+            return False
+        return True
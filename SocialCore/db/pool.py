@@ -0,0 +1,201 @@
+"""
+In-process database connection pool.
+
+Keeps up to `size` idle connections per database alias for reuse, and allows
+up to `max_overflow` extra connections under load, which are closed instead
+of pooled when released. Callers wait up to `timeout` seconds for a free
+slot once every connection is checked out. Idle connections older than
+`recycle` seconds, or failing the health check, are replaced on checkout.
+"""
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection becomes available within the pool timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Attributes:
+        size (int): Maximum number of idle connections kept for reuse.
+        max_overflow (int): Connections allowed beyond `size` while busy.
+        timeout (float): Seconds to wait for a free connection.
+        recycle (float): Maximum age in seconds of a reused connection.
+    """
+
+    def __init__(self, connect, is_usable=None, size=5, max_overflow=10, timeout=30, recycle=3600):
+        """
+        Args:
+            connect (callable): Opens and returns a new connection.
+            is_usable (callable, optional): Returns whether an idle connection is still alive.
+            size (int): Maximum number of idle connections kept for reuse.
+            max_overflow (int): Connections allowed beyond `size` while busy.
+            timeout (float): Seconds to wait for a free connection.
+            recycle (float): Maximum age in seconds of a reused connection.
+        """
+        self._connect = connect
+        self._is_usable = is_usable
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size + max_overflow)
+        self._created_at = {}
+        self._lock = threading.Lock()
+
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.opened = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """
+        Checks out a connection, reusing an idle one when possible.
+
+        Returns:
+            The connection.
+
+        Raises:
+            PoolTimeout: If the pool stays saturated for longer than `timeout`.
+        """
+        if not self._slots.acquire(blocking=False):
+            started = time.monotonic()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - started
+                if not acquired:
+                    self.timeouts += 1
+            if not acquired:
+                logger.warning('Connection pool saturated: %s', self.stats())
+                raise PoolTimeout(f'No connection available within {self.timeout} seconds.')
+        try:
+            connection = self._get_idle() or self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+        return connection
+
+    def release(self, connection, discard=False):
+        """
+        Returns a checked out connection to the pool.
+
+        The connection is closed instead of pooled when `discard` is set, when
+        it cannot be rolled back, or when the pool already holds `size` idle
+        connections.
+
+        Args:
+            connection: A connection obtained from `acquire`.
+            discard (bool): Whether the connection must not be reused.
+        """
+        try:
+            if not discard:
+                try:
+                    connection.rollback()
+                except Exception:
+                    discard = True
+            if discard or self._idle.qsize() >= self.size:
+                self._close(connection)
+            else:
+                self._idle.put(connection)
+        finally:
+            with self._lock:
+                self.checked_out -= 1
+            self._slots.release()
+
+    def close_all(self):
+        """
+        Closes every idle connection.
+        """
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(connection)
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool's usage and saturation counters.
+
+        Returns:
+            dict: Pool limits, current usage and cumulative wait counters.
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'checked_out': self.checked_out,
+                'peak_checked_out': self.peak_checked_out,
+                'idle': self._idle.qsize(),
+                'opened': self.opened,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds': self.wait_seconds,
+                'saturation': self.checked_out / (self.size + self.max_overflow),
+            }
+
+    def _get_idle(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            age = time.monotonic() - self._created_at.get(id(connection), 0)
+            if age < self.recycle and (self._is_usable is None or self._is_usable(connection)):
+                return connection
+            self._close(connection)
+
+    def _open(self):
+        connection = self._connect()
+        with self._lock:
+            self._created_at[id(connection)] = time.monotonic()
+            self.opened += 1
+        return connection
+
+    def _close(self, connection):
+        with self._lock:
+            self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            logger.debug('Error closing pooled connection', exc_info=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory):
+    """
+    Returns the pool for a database alias, creating it with `factory` on first use.
+    """
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = factory()
+        return _pools[alias]
+
+
+def get_pool_stats():
+    """
+    Returns the usage counters of every pool, keyed by database alias.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,149 @@
+"""
+Read replica routing.
+
+Reads are sent to one of the replicas listed in `DATABASE_REPLICAS` only
+inside a `replica_reads()` block, which views opt into for reads that
+tolerate replication lag. The replica is chosen once per block, so all reads
+of a request see the same snapshot. Everything else, and all writes, go to
+the primary.
+
+Users who just wrote something are pinned to the primary for
+`REPLICA_PIN_SECONDS` so that they read their own writes. Pins are stored in
+the default cache, which must be shared by all workers for the pin to hold
+across them.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_alias = ContextVar('replica_alias', default=None)
+
+
+class ReplicaSelector:
+    """
+    Picks the replica serving the next read.
+
+    Supports 'round_robin' selection, and 'least_latency' selection based on
+    an exponentially weighted moving average of recorded query latencies.
+    Replicas without recorded latency are preferred, so each gets sampled.
+    """
+
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+        self._counter = itertools.count()
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def select(self, replicas, strategy='round_robin'):
+        """
+        Args:
+            replicas (list): Aliases of the available replicas.
+            strategy (str): 'round_robin' or 'least_latency'.
+
+        Returns:
+            str: Alias of the selected replica.
+        """
+        if strategy == 'least_latency':
+            with self._lock:
+                return min(replicas, key=lambda alias: self._latencies.get(alias, 0.0))
+        return replicas[next(self._counter) % len(replicas)]
+
+    def record(self, alias, seconds):
+        """
+        Records the latency of a query served by a replica.
+        """
+        with self._lock:
+            previous = self._latencies.get(alias)
+            if previous is None:
+                self._latencies[alias] = seconds
+            else:
+                self._latencies[alias] = previous + self.smoothing * (seconds - previous)
+
+
+selector = ReplicaSelector()
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads():
+    """
+    Routes the reads made inside the block to a replica, when any is configured.
+
+    Yields:
+        str: Alias of the selected replica, or None if there are no replicas.
+    """
+    replicas = get_replicas()
+    alias = None
+    if replicas:
+        alias = selector.select(replicas, getattr(settings, 'REPLICA_SELECTION', 'round_robin'))
+    token = _replica_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica_alias.reset(token)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(*user_ids):
+    """
+    Sends the replica reads of the given users to the primary for `REPLICA_PIN_SECONDS`.
+
+    Args:
+        *user_ids: IDs of users whose data was just written.
+    """
+    if get_replicas():
+        cache.set_many({_pin_key(user_id): True for user_id in user_ids}, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    """
+    Returns whether the user recently wrote and must read from the primary.
+    """
+    return cache.get(_pin_key(user_id), False)
+
+
+def record_replica_latency(alias):
+    """
+    Returns a database execute wrapper recording query latencies of a replica.
+    """
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            selector.record(alias, time.perf_counter() - started)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Database router sending opted-in reads to replicas and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so instances read from a replica are still saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
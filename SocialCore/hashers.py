@@ -0,0 +1,156 @@
+"""
+Password hasher tiers and an off-thread password verifier.
+
+The hashers below read their cost parameters from settings, so each tier can
+be tuned to the hardware it runs on without a code change. `PASSWORD_HASHER`
+selects the tier used for new hashes (see `PASSWORD_HASHER_TIERS`); hashes made by another tier or with
+other parameters keep working and are replaced on the user's next successful
+login.
+
+Verifying a password is the most CPU-expensive step of a login. With
+`PASSWORD_VERIFIER_PROCESSES` set, verification runs in a pool of worker
+processes, so it does not hold the GIL of the web worker and, on the async
+path, does not block the event loop.
+"""
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher, check_password, make_password,
+)
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count of `PBKDF2_ITERATIONS`.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    Scrypt with the costs of `SCRYPT_WORK_FACTOR`, `SCRYPT_BLOCK_SIZE` and `SCRYPT_PARALLELISM`.
+    """
+
+    @property
+    def work_factor(self):
+        return getattr(settings, 'SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return getattr(settings, 'SCRYPT_BLOCK_SIZE', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'SCRYPT_PARALLELISM', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # Scrypt needs 128 * N * r bytes; leave headroom above OpenSSL's 32 MiB default
+        return 2 * 128 * self.work_factor * self.block_size
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with the costs of `ARGON2_TIME_COST`, `ARGON2_MEMORY_COST` (KiB) and `ARGON2_PARALLELISM`.
+
+    Requires the `argon2-cffi` package.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+def verify(raw_password, encoded):
+    """
+    Checks a password against a hash, rehashing it if the hash is outdated.
+
+    Runs in the verifier processes, so it takes and returns plain strings.
+
+    Args:
+        raw_password (str): The password to check.
+        encoded (str): The stored password hash.
+
+    Returns:
+        tuple: Whether the password is correct, and its new hash if the stored one must be replaced, else None.
+    """
+    rehashed = []
+    is_correct = check_password(raw_password, encoded, setter=lambda raw: rehashed.append(make_password(raw)))
+    return is_correct, rehashed[0] if rehashed else None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_verifier_pool():
+    """
+    Returns the process pool verifying passwords, or None to verify in the calling thread.
+
+    The pool has `PASSWORD_VERIFIER_PROCESSES` workers and is created on first use.
+    """
+    global _pool
+    processes = getattr(settings, 'PASSWORD_VERIFIER_PROCESSES', 0)
+    if not processes:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=processes, initializer=django.setup)
+        return _pool
+
+
+def check_user_password(user, raw_password):
+    """
+    Returns whether `raw_password` is the password of `user`.
+
+    A correct password whose hash uses another tier or outdated parameters is
+    rehashed with the preferred hasher and saved.
+
+    Args:
+        user (User): The user logging in.
+        raw_password (str): The password given by the user.
+
+    Returns:
+        bool: Whether the password is correct.
+    """
+    pool = get_verifier_pool()
+    if pool is None:
+        is_correct, rehashed = verify(raw_password, user.password)
+    else:
+        is_correct, rehashed = pool.submit(verify, raw_password, user.password).result()
+    if is_correct and rehashed:
+        user.password = rehashed
+        user.save(update_fields=['password'])
+    return is_correct
+
+
+async def acheck_user_password(user, raw_password):
+    """
+    Async version of `check_user_password`, which never blocks the event loop.
+
+    Without a verifier pool, the password is checked in a worker thread.
+    """
+    pool = get_verifier_pool()
+    if pool is None:
+        is_correct, rehashed = await sync_to_async(verify, thread_sensitive=False)(raw_password, user.password)
+    else:
+        is_correct, rehashed = await asyncio.wrap_future(pool.submit(verify, raw_password, user.password))
+    if is_correct and rehashed:
+        user.password = rehashed
+        await user.asave(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,253 @@
+"""
+Per-request query and latency instrumentation.
+
+`InstrumentationMiddleware` samples a fraction `INSTRUMENTATION_SAMPLE_RATE`
+of requests. For each sampled request it records the following, aggregated
+into histograms per resolved URL name (`user-search`,
+`friend-request-list`, ...):
+
+- the total duration
+- the number of queries and the time spent in the database
+- the time spent authenticating
+- the time spent serializing rows with `ValuesSerializer`, which the list
+  endpoints use; other serializers are not timed
+- the time spent rendering the response data to JSON
+- the slowest SQL statement
+
+Queries are timed by a database execute wrapper installed on every
+connection when it is opened (see `SocialCore.signals`). Outside sampled
+requests, the wrapper only checks a context variable, so unsampled requests
+pay next to nothing. The rate defaults to 10%; compare
+`benchmark_endpoints` runs with and without the middleware to measure the
+overhead at a given rate.
+
+The histograms are served, with other process stats, by `MetricsView` to
+admin users, as JSON or in the Prometheus text format.
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+# Histogram name -> buckets
+METRICS = {
+    'duration_seconds': DURATION_BUCKETS,
+    'db_seconds': DURATION_BUCKETS,
+    'queries': QUERY_COUNT_BUCKETS,
+    'auth_seconds': DURATION_BUCKETS,
+    'serialize_seconds': DURATION_BUCKETS,
+    'render_seconds': DURATION_BUCKETS,
+}
+UNRESOLVED = '<unresolved>'
+
+_current = ContextVar('request_sample', default=None)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, as exposed by Prometheus.
+
+    Attributes:
+        buckets (tuple): Sorted upper bounds of the buckets.
+        counts (list): Observations per bucket, the last one being +Inf.
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """
+        Returns the cumulative count of observations up to each bucket bound, with the sum and count.
+        """
+        cumulative, buckets = 0, []
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'buckets': buckets, 'sum': self.sum, 'count': self.count}
+
+
+class RequestSample:
+    """
+    Measurements of one sampled request.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_sql = None
+        self.slowest_seconds = 0.0
+        self.timings = {}  # Section name -> seconds
+
+    def record_query(self, sql, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_sql, self.slowest_seconds = sql, seconds
+
+
+class MetricsRegistry:
+    """
+    Thread-safe histograms of sampled requests, per URL name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # URL name -> {metric name -> Histogram}
+        self._slowest = {}  # URL name -> (seconds, SQL)
+
+    def record(self, url_name, duration, sample):
+        """
+        Adds a sampled request to the histograms of its URL name.
+
+        Args:
+            url_name (str): The resolved URL name of the request.
+            duration (float): The request's total duration, in seconds.
+            sample (RequestSample): The request's measurements.
+        """
+        values = {
+            'duration_seconds': duration,
+            'db_seconds': sample.db_seconds,
+            'queries': sample.queries,
+            'auth_seconds': sample.timings.get('auth', 0.0),
+            'serialize_seconds': sample.timings.get('serialize', 0.0),
+            'render_seconds': sample.timings.get('render', 0.0),
+        }
+        with self._lock:
+            histograms = self._histograms.get(url_name)
+            if histograms is None:
+                histograms = self._histograms[url_name] = {name: Histogram(buckets) for name, buckets in METRICS.items()}
+            for name, value in values.items():
+                histograms[name].observe(value)
+            if sample.slowest_sql is not None and sample.slowest_seconds > self._slowest.get(url_name, (0, None))[0]:
+                self._slowest[url_name] = (sample.slowest_seconds, sample.slowest_sql)
+
+    def snapshot(self):
+        """
+        Returns the histograms and slowest statement of every URL name.
+        """
+        with self._lock:
+            return {
+                url_name: {
+                    **{name: histogram.snapshot() for name, histogram in histograms.items()},
+                    'slowest_sql': dict(zip(('seconds', 'sql'), self._slowest.get(url_name, (0.0, None)))),
+                }
+                for url_name, histograms in self._histograms.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slowest.clear()
+
+
+registry = MetricsRegistry()
+
+
+def query_recorder(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing the queries of sampled requests.
+    """
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.record_query(sql, time.perf_counter() - started)
+
+
+@contextmanager
+def timed(section):
+    """
+    Adds the time spent in the block to a section of the current sampled request, if any.
+    """
+    sample = _current.get()
+    if sample is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.timings[section] = sample.timings.get(section, 0.0) + time.perf_counter() - started
+
+
+class InstrumentationMiddleware:
+    """
+    Samples requests and records their measurements in `registry`.
+
+    Works for both sync and async requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _start(self):
+        rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.1)
+        if rate <= 0 or random.random() >= rate:
+            return None, None
+        sample = RequestSample()
+        return sample, _current.set(sample)
+
+    def _finish(self, request, sample, token, started):
+        _current.reset(token)
+        match = request.resolver_match
+        registry.record((match.url_name or match.view_name) if match else UNRESOLVED, time.perf_counter() - started, sample)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sample, token = self._start()
+        if sample is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(request, sample, token, started)
+
+    async def __acall__(self, request):
+        sample, token = self._start()
+        if sample is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(request, sample, token, started)
+
+    def process_template_response(self, request, response):
+        # Called right before a DRF response is rendered; the callback runs right after
+        sample = _current.get()
+        if sample is not None:
+            started = time.perf_counter()
+
+            def record_render(response):
+                sample.timings['render'] = sample.timings.get('render', 0.0) + time.perf_counter() - started
+
+            response.add_post_render_callback(record_render)
+        return response
@@ -0,0 +1,118 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+ENDPOINTS = {
+    'search': ('users/search/', {'keyword': 'bench'}),
+    'friends': ('friend-request/list/', {'status': 'accepted'}),
+}
+
+
+class Command(BaseCommand):
+    """
+    Load tests the sync endpoints against their async counterparts.
+
+    Sends the same read requests at increasing numbers of concurrent
+    connections to a WSGI deployment (`--wsgi-url`) and an ASGI deployment
+    (`--asgi-url`) of the project, and reports throughput, latency percentiles
+    and failed requests for each. Both servers must be started beforehand and
+    share the database this command runs against, which is used to issue the
+    access token of `--email`.
+    """
+    help = 'Compare the concurrent-connection capacity of the sync (WSGI) and async (ASGI) endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000/', help='Base URL of the WSGI server.')
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001/', help='Base URL of the ASGI server.')
+        parser.add_argument('--email', required=True, help='Email of the user the requests are made as.')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='search', help='Endpoint to load.')
+        parser.add_argument('--keyword', default='bench', help='Search keyword for the search endpoint.')
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[10, 50, 200],
+            help='Numbers of concurrent connections to measure.',
+        )
+        parser.add_argument('--requests', type=int, default=10, help='Requests per connection.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request counts as failed.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(normalized_email=User.normalize_email_key(options['email']))
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']!r}.")
+        self.token = str(RefreshToken.for_user(user).access_token)
+        self.timeout = options['timeout']
+
+        path, params = ENDPOINTS[options['endpoint']]
+        if options['endpoint'] == 'search':
+            params = {**params, 'keyword': options['keyword']}
+        query = f'{path}?{urlencode(params)}'
+
+        targets = [
+            ('WSGI', options['wsgi_url'].rstrip('/') + '/' + query),
+            ('ASGI', options['asgi_url'].rstrip('/') + '/async/' + query),
+        ]
+        for concurrency in options['concurrency']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{concurrency} concurrent connections'))
+            for label, url in targets:
+                self.report(label, *self.load(url, concurrency, options['requests']))
+
+    def load(self, url, concurrency, requests_per_connection):
+        """
+        Sends `requests_per_connection` sequential requests on each of `concurrency` connections.
+
+        Returns:
+            tuple: The latencies of successful requests in seconds, the number of failures and the elapsed time.
+        """
+        def connection(_):
+            latencies, failures = [], 0
+            for _ in range(requests_per_connection):
+                latency = self.fetch(url)
+                if latency is None:
+                    failures += 1
+                else:
+                    latencies.append(latency)
+            return latencies, failures
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(connection, range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for connection_latencies, _ in results for latency in connection_latencies]
+        return latencies, sum(failures for _, failures in results), elapsed
+
+    def fetch(self, url):
+        """
+        Returns the latency of one authenticated GET request, or None if it failed.
+        """
+        request = Request(url, headers={'Authorization': f'Bearer {self.token}'})
+        started = time.perf_counter()
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except HTTPError as exc:
+            # The 404 of an empty friend list is still a served request
+            if exc.code != 404:
+                return None
+        except (URLError, OSError):
+            return None
+        return time.perf_counter() - started
+
+    def report(self, label, latencies, failures, elapsed):
+        if len(latencies) < 2:
+            self.stdout.write(f'  {label}: {failures} failed, not enough successful requests to report')
+            return
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'  {label}: {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50={quantiles[49] * 1000:7.2f}ms  p95={quantiles[94] * 1000:7.2f}ms  '
+            f'p99={quantiles[98] * 1000:7.2f}ms  failed={failures}'
+        )
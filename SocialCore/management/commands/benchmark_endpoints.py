@@ -0,0 +1,316 @@
+import json
+import random
+import statistics
+import time
+from array import array
+from datetime import timedelta
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from SocialCore.models import FriendRequest, Friendship, UserSearchToken
+from SocialCore.search import user_ngrams
+
+from .benchmark_friend_requests import BENCH_EMAIL_DOMAIN, explicit_created_at
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'benchmark-password'
+FIRST_NAMES = ['alice', 'bob', 'carol', 'dave', 'erin', 'frank', 'grace', 'heidi', 'ivan', 'judy', 'mallory', 'oscar']
+LAST_NAMES = ['smith', 'jones', 'brown', 'taylor', 'wilson', 'davies', 'evans', 'thomas', 'roberts', 'walker']
+WORKLOADS = ['signup', 'login', 'search', 'send', 'act', 'list']
+
+
+class Command(BaseCommand):
+    """
+    Seeds a synthetic social graph and replays the main API workloads against it.
+
+    Friendships follow a power-law degree distribution: every user draws a
+    degree from a Pareto distribution and friends are paired at random among
+    these degree "stubs" (the configuration model), so a few users have very
+    many friends and most have few. Pending requests are sent to users picked
+    the same way. All rows are written with `bulk_create` in batches, and the
+    denormalized counters are recomputed at the end with
+    `repair_friend_counts`.
+
+    Each workload is then replayed through the Django test client, reporting
+    latency percentiles, queries per request and throughput, or against a
+    running server with `--url` (queries are not counted then). Nothing
+    leaves the machine; SQLite and a local MySQL both work.
+
+    Intended for a scratch database: seeded rows are removed afterwards
+    unless `--keep` is given, and can be reused by a later run with `--reuse`.
+    """
+    help = 'Seed a power-law social graph and report latency, queries and throughput of the API workloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000, help='Number of users to seed.')
+        parser.add_argument('--avg-friends', type=float, default=20, help='Average number of friends per user.')
+        parser.add_argument('--alpha', type=float, default=2.5, help='Exponent of the power-law degree distribution (> 1).')
+        parser.add_argument('--pending', type=float, default=2, help='Average number of pending requests per user.')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per bulk_create batch.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per workload.')
+        parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=WORKLOADS, help='Workloads to replay.')
+        parser.add_argument('--url', help='Base URL of a running server; defaults to the in-process test client.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument('--reuse', action='store_true', help='Reuse users seeded by an earlier run with --keep.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows.')
+
+    def handle(self, *args, **options):
+        if options['alpha'] <= 1:
+            raise CommandError('--alpha must be greater than 1.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.url = options['url']
+        self.client = Client(HTTP_HOST='localhost')
+
+        seeded = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+        if options['reuse']:
+            self.user_ids = list(seeded.order_by('id').values_list('id', flat=True))
+            if not self.user_ids:
+                raise CommandError('No seeded users to reuse.')
+        else:
+            if seeded.exists():
+                raise CommandError('Seeded users already exist; pass --reuse or remove them first.')
+            self.seed(options['users'], options['avg_friends'], options['alpha'], options['pending'])
+
+        try:
+            for workload in options['workloads']:
+                self.run_workload(workload, options['requests'])
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    # Seeding
+
+    def seed(self, count, avg_friends, alpha, pending_per_user):
+        started = time.perf_counter()
+        self.user_ids = self.seed_users(count)
+        stubs = self.degree_stubs(count, avg_friends, alpha)
+        self.seed_friendships(stubs)
+        self.seed_pending_requests(stubs, int(count * pending_per_user))
+        call_command('repair_friend_counts', batch_size=self.batch_size, stdout=self.stdout)
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+    def seed_users(self, count):
+        """
+        Bulk inserts `count` users and their search tokens, and returns the user IDs in creation order.
+        """
+        self.stdout.write(f'Seeding {count} users...')
+        password = make_password(BENCH_PASSWORD)  # Hashed once: hashing every user would dominate seeding
+        for start in range(0, count, self.batch_size):
+            users = []
+            for i in range(start, min(start + self.batch_size, count)):
+                email = f'user{i}@{BENCH_EMAIL_DOMAIN}'
+                users.append(User(
+                    email=email,
+                    normalized_email=email,
+                    password=password,
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                ))
+            User.objects.bulk_create(users)
+        user_ids = list(
+            User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').order_by('id').values_list('id', flat=True)
+        )
+
+        self.stdout.write('Indexing users for search...')
+        users = User.objects.filter(id__in=user_ids).only('id', 'email', 'first_name', 'last_name')
+        tokens = []
+        for user in users.iterator(chunk_size=self.batch_size):
+            tokens.extend(UserSearchToken(user_id=user.id, token=token) for token in user_ngrams(user))
+            if len(tokens) >= self.batch_size:
+                UserSearchToken.objects.bulk_create(tokens, ignore_conflicts=True)
+                tokens = []
+        UserSearchToken.objects.bulk_create(tokens, ignore_conflicts=True)
+        return user_ids
+
+    def degree_stubs(self, count, avg_friends, alpha):
+        """
+        Returns a shuffled array holding every user ID once per friend it should get.
+
+        Degrees are drawn from a Pareto distribution scaled to `avg_friends` on
+        average and capped at the number of users.
+        """
+        scale = avg_friends * (alpha - 1) / alpha
+        stubs = array('q')
+        for user_id in self.user_ids:
+            degree = min(count - 1, int(round(scale * self.rng.paretovariate(alpha))))
+            stubs.extend([user_id] * degree)
+        self.rng.shuffle(stubs)
+        return stubs
+
+    def seed_friendships(self, stubs):
+        """
+        Pairs consecutive stubs into friendships, stored as accepted requests and both friendship edges.
+
+        Self-loops are dropped; the few duplicate pairs are ignored by the
+        unique constraint on friendship edges.
+        """
+        self.stdout.write(f'Seeding about {len(stubs) // 2} friendships...')
+        now = timezone.now()
+        with explicit_created_at():
+            for start in range(0, len(stubs) - 1, 2 * self.batch_size):
+                requests, edges = [], []
+                for i in range(start, min(start + 2 * self.batch_size, len(stubs) - 1), 2):
+                    user_id, friend_id = stubs[i], stubs[i + 1]
+                    if user_id == friend_id:
+                        continue
+                    requests.append(FriendRequest(
+                        from_user_id=user_id, to_user_id=friend_id, status='accepted',
+                        created_at=now - timedelta(seconds=self.rng.randrange(365 * 24 * 3600)),
+                    ))
+                    edges.append(Friendship(user_id=user_id, friend_id=friend_id))
+                    edges.append(Friendship(user_id=friend_id, friend_id=user_id))
+                FriendRequest.objects.bulk_create(requests)
+                Friendship.objects.bulk_create(edges, ignore_conflicts=True)
+
+    def seed_pending_requests(self, stubs, count):
+        """
+        Bulk inserts `count` pending requests from random users to users picked in proportion to their degree.
+        """
+        self.stdout.write(f'Seeding {count} pending requests...')
+        now = timezone.now()
+        with explicit_created_at():
+            for start in range(0, count, self.batch_size):
+                requests = []
+                for _ in range(min(self.batch_size, count - start)):
+                    from_user_id = self.rng.choice(self.user_ids)
+                    to_user_id = self.rng.choice(stubs) if stubs else self.rng.choice(self.user_ids)
+                    if from_user_id != to_user_id:
+                        requests.append(FriendRequest(
+                            from_user_id=from_user_id, to_user_id=to_user_id,
+                            created_at=now - timedelta(seconds=self.rng.randrange(7 * 24 * 3600)),
+                        ))
+                FriendRequest.objects.bulk_create(requests)
+
+    def cleanup(self):
+        """
+        Removes the seeded rows.
+        """
+        self.stdout.write('Removing seeded rows...')
+        seeded = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+        # Related rows first, so deleting the users has nothing left to cascade to
+        Friendship.objects.filter(user__in=seeded).delete()
+        FriendRequest.objects.filter(from_user__in=seeded).delete()
+        FriendRequest.objects.filter(to_user__in=seeded).delete()
+        UserSearchToken.objects.filter(user__in=seeded).delete()
+        seeded.delete()
+
+    # Workloads
+
+    def auth_header(self, user_id):
+        return f'Bearer {RefreshToken.for_user(User(pk=user_id)).access_token}'
+
+    def workload_requests(self, workload, count):
+        """
+        Returns `count` requests of a workload as (method, path, body, user ID to authenticate as) tuples.
+        """
+        rng = self.rng
+        if workload == 'signup':
+            suffix = int(time.time())
+            return [
+                ('post', reverse('user-signup'), {
+                    'email': f'signup{suffix}-{i}@{BENCH_EMAIL_DOMAIN}', 'password': 'x8!kQz#pLm-bench',
+                    'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+                }, None)
+                for i in range(count)
+            ]
+        if workload == 'login':
+            emails = User.objects.filter(id__in=rng.sample(self.user_ids, min(count, len(self.user_ids))))
+            emails = list(emails.values_list('email', flat=True))
+            return [
+                ('post', reverse('user-login'), {'email': rng.choice(emails), 'password': BENCH_PASSWORD}, None)
+                for _ in range(count)
+            ]
+        if workload == 'search':
+            return [
+                ('get', reverse('user-search'), {'keyword': rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(3, 5)]},
+                 rng.choice(self.user_ids))
+                for _ in range(count)
+            ]
+        if workload == 'send':
+            # A different sender for every request, to stay within the rate limit
+            senders = rng.sample(self.user_ids, min(count, len(self.user_ids)))
+            return [
+                ('post', reverse('friend-request-send'), {'to_user': rng.choice(self.user_ids)}, sender)
+                for sender in senders
+            ]
+        if workload == 'act':
+            pending = list(
+                FriendRequest.objects.filter(to_user__email__endswith=f'@{BENCH_EMAIL_DOMAIN}', status='pending')
+                .values_list('id', 'to_user_id')[:count * 10]
+            )
+            return [
+                ('patch', reverse('friend-request-action', args=[request_id]),
+                 {'status': rng.choice(['accepted', 'rejected'])}, to_user_id)
+                for request_id, to_user_id in rng.sample(pending, min(count, len(pending)))
+            ]
+        return [
+            ('get', reverse('friend-request-list'), {'status': rng.choice(['accepted', 'pending'])}, rng.choice(self.user_ids))
+            for _ in range(count)
+        ]
+
+    def send(self, method, path, body, user_id):
+        """
+        Sends one request and returns its status code and the number of queries it ran, or None with `--url`.
+        """
+        headers = {'HTTP_AUTHORIZATION': self.auth_header(user_id)} if user_id else {}
+        if self.url:
+            if method == 'get':
+                query, data = '?' + '&'.join(f'{key}={value}' for key, value in body.items()), None
+            else:
+                query, data = '', json.dumps(body).encode()
+            request = Request(
+                self.url.rstrip('/') + path + query, data=data, method=method.upper(),
+                headers={'Content-Type': 'application/json', **({'Authorization': headers['HTTP_AUTHORIZATION']} if headers else {})},
+            )
+            try:
+                with urlopen(request) as response:
+                    response.read()
+                    return response.status, None
+            except HTTPError as exc:
+                return exc.code, None
+
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'get':
+                response = self.client.get(path, body, **headers)
+            else:
+                response = getattr(self.client, method)(path, body, content_type='application/json', **headers)
+        return response.status_code, len(queries)
+
+    def run_workload(self, workload, count):
+        requests = self.workload_requests(workload, count)
+        if not requests:
+            self.stdout.write(f'{workload:>7}: nothing to replay')
+            return
+        latencies, query_counts, errors = [], [], 0
+        started = time.perf_counter()
+        for request in requests:
+            request_started = time.perf_counter()
+            status_code, query_count = self.send(*request)
+            latencies.append(time.perf_counter() - request_started)
+            if query_count is not None:
+                query_counts.append(query_count)
+            # Empty lists answer 404, which is still a served request
+            if status_code >= 500 or (status_code >= 400 and status_code != 404):
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+        queries = f'{statistics.mean(query_counts):5.1f}' if query_counts else '    -'
+        self.stdout.write(
+            f'{workload:>7}: {len(requests) / elapsed:8.1f} req/s  p50={quantiles[49] * 1000:8.2f}ms  '
+            f'p95={quantiles[94] * 1000:8.2f}ms  p99={quantiles[98] * 1000:8.2f}ms  '
+            f'queries/req={queries}  errors={errors}'
+        )
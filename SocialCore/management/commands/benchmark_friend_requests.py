@@ -0,0 +1,172 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from SocialCore.models import FriendRequest
+
+User = get_user_model()
+
+BENCH_EMAIL_DOMAIN = 'bench.invalid'
+
+
+@contextmanager
+def explicit_created_at():
+    """
+    Temporarily disables `auto_now_add` on `FriendRequest.created_at` so seeded
+    rows can be spread over time instead of all sharing the insert timestamp.
+    """
+    field = FriendRequest._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the `FriendRequest` query shapes used on the hot paths.
+
+    Seeds synthetic users and friend requests, then times the rate limit count,
+    the duplicate check and the pending list, printing the query plan of each.
+    Unless `--skip-baseline` is given, the queries are measured once with the
+    composite indexes dropped and once with them in place.
+
+    Intended for a scratch database: seeded rows are removed afterwards unless
+    `--keep` is given.
+    """
+    help = 'Seed friend requests and compare query plans and latencies with and without the composite indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000, help='Number of users to seed.')
+        parser.add_argument('--requests', type=int, default=2_000_000, help='Number of friend requests to seed.')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per bulk_create batch.')
+        parser.add_argument('--repeat', type=int, default=200, help='Executions per query shape.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument('--database', default='default', help='Database alias to benchmark.')
+        parser.add_argument('--skip-baseline', action='store_true', help='Only measure with indexes in place.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows.')
+
+    def handle(self, *args, **options):
+        self.database = options['database']
+        self.rng = random.Random(options['seed'])
+
+        user_ids = self.seed_users(options['users'], options['batch_size'])
+        self.seed_requests(user_ids, options['requests'], options['batch_size'])
+
+        try:
+            if not options['skip_baseline']:
+                with self.indexes_dropped():
+                    self.run_queries('without composite indexes', user_ids, options['repeat'])
+            self.run_queries('with composite indexes', user_ids, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed_users(self, count, batch_size):
+        """
+        Bulk inserts `count` users on the benchmark email domain and returns their IDs.
+        """
+        self.stdout.write(f'Seeding {count} users...')
+        for start in range(0, count, batch_size):
+            User.objects.using(self.database).bulk_create([
+                User(
+                    email=f'user{i}@{BENCH_EMAIL_DOMAIN}',
+                    normalized_email=f'user{i}@{BENCH_EMAIL_DOMAIN}',
+                    password='!',
+                    first_name=f'first{i}',
+                    last_name=f'last{i}',
+                )
+                for i in range(start, min(start + batch_size, count))
+            ])
+        return list(
+            User.objects.using(self.database)
+            .filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+            .values_list('id', flat=True)
+        )
+
+    def seed_requests(self, user_ids, count, batch_size):
+        """
+        Bulk inserts `count` friend requests between random pairs of seeded users,
+        spread over the last 30 days with a realistic status mix.
+        """
+        self.stdout.write(f'Seeding {count} friend requests...')
+        now = timezone.now()
+        statuses = ['pending', 'accepted', 'rejected']
+        with explicit_created_at():
+            for start in range(0, count, batch_size):
+                batch = []
+                for _ in range(min(batch_size, count - start)):
+                    from_user_id, to_user_id = self.rng.sample(user_ids, 2)
+                    batch.append(FriendRequest(
+                        from_user_id=from_user_id,
+                        to_user_id=to_user_id,
+                        status=self.rng.choices(statuses, weights=[3, 5, 2])[0],
+                        created_at=now - timedelta(seconds=self.rng.randrange(30 * 24 * 3600)),
+                    ))
+                FriendRequest.objects.using(self.database).bulk_create(batch)
+
+    @contextmanager
+    def indexes_dropped(self):
+        """
+        Drops the `FriendRequest` composite indexes for the duration of the block.
+        """
+        indexes = FriendRequest._meta.indexes
+        with connections[self.database].schema_editor() as editor:
+            for index in indexes:
+                editor.remove_index(FriendRequest, index)
+        try:
+            yield
+        finally:
+            with connections[self.database].schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(FriendRequest, index)
+
+    def query_shapes(self):
+        """
+        Returns the hot query shapes as (name, callable(user_id, other_id)) pairs.
+        """
+        manager = FriendRequest.objects.using(self.database)
+        return [
+            ('rate limit count', lambda user_id, other_id: manager.filter(
+                from_user_id=user_id, created_at__gte=timezone.now() - timedelta(minutes=1))),
+            ('duplicate check', lambda user_id, other_id: manager.filter(
+                from_user_id=user_id, to_user_id=other_id, status='pending')),
+            ('pending list', lambda user_id, other_id: manager.filter(
+                to_user_id=user_id, status='pending').order_by('id')[:10]),
+        ]
+
+    def run_queries(self, label, user_ids, repeat):
+        """
+        Prints the plan and latency percentiles of every query shape.
+        """
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {label}'))
+        for name, build in self.query_shapes():
+            self.stdout.write(f'\n-- {name}')
+            self.stdout.write(build(user_ids[0], user_ids[1]).explain())
+            timings = []
+            for _ in range(repeat):
+                user_id, other_id = self.rng.sample(user_ids, 2)
+                started = time.perf_counter()
+                list(build(user_id, other_id))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'p50={statistics.median(timings):.3f}ms '
+                f'p95={timings[int(len(timings) * 0.95) - 1]:.3f}ms '
+                f'max={timings[-1]:.3f}ms'
+            )
+
+    def cleanup(self):
+        """
+        Removes the seeded users; their friend requests are deleted by cascade.
+        """
+        self.stdout.write('Removing seeded rows...')
+        User.objects.using(self.database).filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+from array import array
+
+from django.core.management.base import BaseCommand
+
+from SocialCore.recommendations import FriendGraph
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the friend graph behind friend suggestions on a synthetic graph.
+
+    Generates `--edges` random friendships between `--users` users in memory
+    (no database is involved), builds the graph, then times suggestions and
+    mutual friend lookups for random users and reports the graph's size.
+    """
+    help = 'Build a synthetic friend graph and time friend suggestions and mutual friend lookups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help='Number of users.')
+        parser.add_argument('--edges', type=int, default=50_000_000, help='Number of friendships.')
+        parser.add_argument('--queries', type=int, default=1000, help='Lookups to time.')
+        parser.add_argument('--limit', type=int, default=10, help='Suggestions per lookup.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        max_id = options['users']
+
+        self.stdout.write(f"Generating {options['edges']} friendships between {max_id} users...")
+        started = time.perf_counter()
+        users, friends = array('i'), array('i')
+        for _ in range(options['edges']):
+            user_id = rng.randint(1, max_id)
+            friend_id = rng.randint(1, max_id)
+            if user_id != friend_id:
+                # Duplicate pairs are possible but negligible at this density
+                users.extend((user_id, friend_id))
+                friends.extend((friend_id, user_id))
+        self.stdout.write(f'  generated in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        graph = FriendGraph.from_edges(users, friends, max_id)
+        del users, friends
+        self.stdout.write(
+            f'Built graph in {time.perf_counter() - started:.1f}s: '
+            f'{graph.size_in_bytes / 2 ** 20:.1f} MiB, {len(graph.neighbors) / max_id:.1f} friends per user'
+        )
+
+        sample = [rng.randint(1, max_id) for _ in range(options['queries'])]
+        self.report('suggest', [lambda user_id=user_id: graph.suggest(user_id, options['limit']) for user_id in sample])
+        pairs = [(user_id, rng.choice(graph.friends(user_id) or [user_id])) for user_id in sample]
+        self.report('mutual_friends', [lambda pair=pair: graph.mutual_friends(*pair) for pair in pairs])
+
+    def report(self, label, calls):
+        durations = []
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            durations.append(time.perf_counter() - started)
+        quantiles = statistics.quantiles(durations, n=100)
+        self.stdout.write(
+            f'  {label:<15} p50={quantiles[49] * 1000:8.3f}ms  p95={quantiles[94] * 1000:8.3f}ms  '
+            f'p99={quantiles[98] * 1000:8.3f}ms'
+        )
@@ -0,0 +1,113 @@
+import io
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from SocialCore.models import FriendRequest
+from SocialCore.parsers import FastJSONParser, orjson
+from SocialCore.renderers import FastJSONRenderer
+from SocialCore.serializers import FriendRequestListSerializer, UserSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks JSON rendering and parsing of the payloads of the list endpoints.
+
+    Builds responses shaped like those of user search, the accepted and
+    pending friend lists and friend suggestions from unsaved model instances
+    (no database is involved), then times DRF's `JSONRenderer` and
+    `JSONParser` against `FastJSONRenderer` and `FastJSONParser`, with
+    `orjson` when it is installed and with the standard library fallback.
+    Every renderer's output is checked to decode to the same data as DRF's.
+    """
+    help = 'Time DRF JSON rendering and parsing against the fast renderer and parser for each list endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[10, 100], help='Results per page.')
+        parser.add_argument('--iterations', type=int, default=2000, help='Renders timed per payload and renderer.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        renderers = {'drf': JSONRenderer(), 'fast-stdlib': FastJSONRenderer()}
+        renderers['fast-stdlib'].use_orjson = False
+        parsers = {'drf': JSONParser(), 'fast-stdlib': FastJSONParser()}
+        parsers['fast-stdlib'].use_orjson = False
+        if orjson is not None:
+            renderers['fast-orjson'] = FastJSONRenderer()
+            parsers['fast-orjson'] = FastJSONParser()
+        else:
+            self.stdout.write('orjson is not installed; timing the standard library fallback only.')
+
+        for page_size in options['page_sizes']:
+            for endpoint, data in self.payloads(page_size).items():
+                expected = renderers['drf'].render(data)
+                self.stdout.write(f'{endpoint} ({page_size} results, {len(expected)} bytes)')
+                baseline = None
+                for name, renderer in renderers.items():
+                    if json.loads(renderer.render(data)) != json.loads(expected):
+                        self.stderr.write(f'  {name} output differs from JSONRenderer')
+                    median = self.time(lambda: renderer.render(data), options['iterations'])
+                    baseline = baseline or median
+                    self.report(f'render {name}', median, baseline)
+                baseline = None
+                for name, parser in parsers.items():
+                    median = self.time(lambda: parser.parse(io.BytesIO(expected)), options['iterations'])
+                    baseline = baseline or median
+                    self.report(f'parse {name}', median, baseline)
+
+    def users(self, count):
+        return [
+            User(
+                id=self.rng.randint(1, 10 ** 6),
+                email=f'member{i}@example.com',
+                first_name=self.rng.choice(['Ana', 'Bo', 'Chloé', 'Dmitri']),
+                last_name=self.rng.choice(['Smith', 'Ng', 'Müller', "O'Brien"]),
+                friend_count=self.rng.randint(0, 500),
+                pending_incoming_count=self.rng.randint(0, 20),
+            )
+            for i in range(count)
+        ]
+
+    def payloads(self, page_size):
+        """
+        Returns the response data of each list endpoint for one page of `page_size` results.
+        """
+        def page(results):
+            return {'count': page_size * 10, 'next': 'http://localhost/list/?page=2', 'previous': None, 'results': results}
+
+        now = timezone.now()
+        requests = [
+            FriendRequest(id=i, from_user=sender, to_user=receiver, status='pending', created_at=now - timedelta(minutes=i))
+            for i, (sender, receiver) in enumerate(zip(self.users(page_size), self.users(page_size)))
+        ]
+        users = UserSerializer(self.users(page_size), many=True).data
+        return {
+            'user-search': page(users),
+            'friend-request-list (accepted)': page(users),
+            'friend-request-list (pending)': page(FriendRequestListSerializer(requests, many=True).data),
+            'friend-suggestions': {
+                'results': [{**user, 'mutual_friends': self.rng.randint(1, 50)} for user in users],
+            },
+        }
+
+    def time(self, call, iterations):
+        durations = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            durations.append(time.perf_counter() - started)
+        return statistics.median(durations)
+
+    def report(self, label, median, baseline):
+        self.stdout.write(f'  {label:<20} {median * 1e6:9.1f}us  x{baseline / median:5.2f}')
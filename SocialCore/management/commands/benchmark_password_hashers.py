@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from SocialCore.hashers import verify
+
+
+def verify_many(tier, encoded, count):
+    """
+    Verifies the benchmark password `count` times with the hashers of `tier`.
+    """
+    with override_settings(PASSWORD_HASHERS=[settings.PASSWORD_HASHER_TIERS[tier]]):
+        for _ in range(count):
+            verify('benchmark-password', encoded)
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks password verification, the CPU-bound part of a login, for each hasher tier.
+
+    For every tier the password is hashed with the configured cost parameters,
+    then verified `--logins` times in this process and, with `--processes`,
+    spread over a process pool. The result is reported as logins per second
+    per core; tiers whose library is not installed are skipped.
+    """
+    help = 'Report logins per second per core for each password hasher tier.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tiers', nargs='+', choices=sorted(settings.PASSWORD_HASHER_TIERS),
+            default=list(settings.PASSWORD_HASHER_TIERS), help='Hasher tiers to measure.',
+        )
+        parser.add_argument('--logins', type=int, default=20, help='Password verifications per core.')
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Processes for the parallel measurement, or 0 to skip it.',
+        )
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        processes = options['processes']
+        for tier in options['tiers']:
+            try:
+                with override_settings(PASSWORD_HASHERS=[settings.PASSWORD_HASHER_TIERS[tier]]):
+                    encoded = make_password('benchmark-password')
+            except ValueError as exc:
+                self.stdout.write(self.style.WARNING(f'{tier}: skipped ({exc})'))
+                continue
+
+            started = time.perf_counter()
+            verify_many(tier, encoded, logins)
+            single = logins / (time.perf_counter() - started)
+            line = f'{tier:>7}: {single:8.2f} logins/s on one core'
+
+            if processes:
+                with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as executor:
+                    # Start the workers before timing
+                    list(executor.map(verify_many, [tier] * processes, [encoded] * processes, [1] * processes))
+                    started = time.perf_counter()
+                    list(executor.map(verify_many, [tier] * processes, [encoded] * processes, [logins] * processes))
+                    parallel = processes * logins / (time.perf_counter() - started)
+                cores = min(processes, os.cpu_count())
+                line += f', {parallel / cores:8.2f} logins/s per core over {processes} processes'
+            self.stdout.write(line)
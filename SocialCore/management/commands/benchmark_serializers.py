@@ -0,0 +1,90 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from SocialCore.models import FriendRequest
+from SocialCore.serializers import FriendRequestListSerializer, UserSerializer, UserSignupSerializer, ValuesSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks `ValuesSerializer` against the `ModelSerializer`s of the list endpoints.
+
+    Builds `--rows` unsaved users and friend requests (no database is
+    involved) and the `.values()` rows holding the same data, then reports
+    the rows serialized per second by each serializer, after checking that
+    both produce the same output.
+    """
+    help = 'Compare rows per second of the ModelSerializers and their ValuesSerializer counterparts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per serialization.')
+        parser.add_argument('--repeat', type=int, default=20, help='Serializations timed per serializer.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['rows']
+        users = [
+            User(
+                id=i + 1,
+                email=f'member{i}@example.com',
+                first_name=rng.choice(['Ana', 'Bo', 'Chloé', 'Dmitri']),
+                last_name=rng.choice(['Smith', 'Ng', 'Müller', "O'Brien"]),
+                friend_count=rng.randint(0, 500),
+                pending_incoming_count=rng.randint(0, 20),
+            )
+            for i in range(count)
+        ]
+        now = timezone.now()
+        requests = [
+            FriendRequest(
+                id=i + 1, from_user=users[i], to_user=users[(i + 1) % count], status='pending',
+                created_at=now - timedelta(seconds=rng.randrange(7 * 24 * 3600)),
+            )
+            for i in range(count)
+        ]
+
+        for serializer_class, instances in (
+            (UserSerializer, users), (UserSignupSerializer, users), (FriendRequestListSerializer, requests),
+        ):
+            values_serializer = ValuesSerializer(serializer_class)
+            rows = [self.values_row(instance, values_serializer.columns) for instance in instances]
+            if values_serializer.serialize(rows) != serializer_class(instances, many=True).data:
+                self.stderr.write(f'{serializer_class.__name__}: outputs differ')
+
+            baseline = self.rows_per_second(lambda: serializer_class(instances, many=True).data, count, options['repeat'])
+            fast = self.rows_per_second(lambda: values_serializer.serialize(rows), count, options['repeat'])
+            self.stdout.write(
+                f'{serializer_class.__name__:<28} ModelSerializer {baseline:>11,.0f} rows/s  '
+                f'ValuesSerializer {fast:>11,.0f} rows/s  x{fast / baseline:5.1f}'
+            )
+
+    @staticmethod
+    def values_row(instance, columns):
+        """
+        Returns the `.values()` row of an instance, following `__` lookups through related objects.
+        """
+        row = {}
+        for column in columns:
+            value = instance
+            for attr in column.split('__'):
+                value = getattr(value, attr)
+            # A bare foreign key lookup yields the related object's ID in `.values()`
+            row[column] = value.pk if isinstance(value, User) else value
+        return row
+
+    @staticmethod
+    def rows_per_second(call, count, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            best = min(best, time.perf_counter() - started)
+        return count / best
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from SocialCore.search import SEARCH_FIELDS, index_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the trigram search tokens of every user.
+
+    Needed after user names or emails were changed without `save()`, such as
+    with `QuerySet.update()`, which does not send the signal that keeps the
+    index in sync. Users are reindexed in batches of consecutive IDs, each in
+    its own transaction, so the command can run while the application is
+    serving requests.
+    """
+    help = 'Rebuild the search tokens of all users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per batch.')
+
+    def handle(self, *args, **options):
+        indexed = 0
+        last_id = 0
+        while True:
+            users = list(
+                User.objects.filter(pk__gt=last_id).order_by('pk').only('id', *SEARCH_FIELDS)[:options['batch_size']]
+            )
+            if not users:
+                break
+            with transaction.atomic():
+                index_users(users)
+            indexed += len(users)
+            last_id = users[-1].pk
+        self.stdout.write(f'Reindexed {indexed} users.')
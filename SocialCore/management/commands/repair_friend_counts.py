@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from SocialCore.models import FriendRequest, Friendship
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the denormalized `friend_count` and `pending_incoming_count` of every user.
+
+    Users are processed in batches of consecutive IDs. Each batch is locked
+    while its counts are compared with the friendships and pending requests
+    in the database, and only users whose counts drifted are updated, so the
+    command can run while the application is serving requests.
+    """
+    help = 'Recompute friend and pending request counts of users and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it.')
+
+    def handle(self, *args, **options):
+        friend_count = Subquery(
+            Friendship.objects.filter(user=OuterRef('pk')).values('user').annotate(count=Count('*')).values('count')
+        )
+        pending_incoming_count = Subquery(
+            FriendRequest.objects.filter(to_user=OuterRef('pk'), status='pending')
+            .values('to_user').annotate(count=Count('*')).values('count')
+        )
+
+        checked = repaired = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Locking the users makes concurrent counter updates wait for the repair
+                ids = list(
+                    User.objects.select_for_update().filter(pk__gt=last_id).order_by('pk')
+                    .values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                drifted = [
+                    user for user in User.objects.filter(pk__in=ids).annotate(
+                        actual_friend_count=Coalesce(friend_count, 0),
+                        actual_pending_incoming_count=Coalesce(pending_incoming_count, 0),
+                    ).only('id', *User.COUNTER_FIELDS)
+                    if (user.friend_count, user.pending_incoming_count)
+                    != (user.actual_friend_count, user.actual_pending_incoming_count)
+                ]
+                if drifted and not options['dry_run']:
+                    for user in drifted:
+                        user.friend_count = user.actual_friend_count
+                        user.pending_incoming_count = user.actual_pending_incoming_count
+                    User.objects.bulk_update(drifted, User.COUNTER_FIELDS)
+            checked += len(ids)
+            repaired += len(drifted)
+            last_id = ids[-1]
+
+        verb = 'Found drift in' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'{verb} {repaired} of {checked} users.')
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-17 10:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_friendships(apps, schema_editor):
+    """
+    Creates both directions of a friendship for every accepted friend request.
+    """
+    FriendRequest = apps.get_model('SocialCore', 'FriendRequest')
+    Friendship = apps.get_model('SocialCore', 'Friendship')
+    accepted = FriendRequest.objects.filter(status='accepted').values_list('from_user_id', 'to_user_id')
+    edges = []
+    for from_user_id, to_user_id in accepted.iterator(chunk_size=1000):
+        edges.append(Friendship(user_id=from_user_id, friend_id=to_user_id))
+        edges.append(Friendship(user_id=to_user_id, friend_id=from_user_id))
+        if len(edges) >= 1000:
+            Friendship.objects.bulk_create(edges, ignore_conflicts=True)
+            edges = []
+    Friendship.objects.bulk_create(edges, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SocialCore', '0002_friendrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_of', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friendships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'friend'), name='unique_friendship_edge')],
+            },
+        ),
+        migrations.RunPython(backfill_friendships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-17 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SocialCore', '0003_friendship'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['from_user', 'created_at'], name='friendreq_from_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['from_user', 'to_user', 'status'], name='friendreq_from_to_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'status'], name='friendreq_to_status_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-17 10:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_search_tokens(apps, schema_editor):
+    """
+    Indexes the trigrams of every existing user's email, first name and last name.
+    """
+    CustomUser = apps.get_model('SocialCore', 'CustomUser')
+    UserSearchToken = apps.get_model('SocialCore', 'UserSearchToken')
+    tokens = []
+    users = CustomUser.objects.values_list('id', 'email', 'first_name', 'last_name')
+    for user_id, *values in users.iterator(chunk_size=1000):
+        grams = set()
+        for value in values:
+            value = (value or '').lower()
+            grams |= {value[i:i + 3] for i in range(len(value) - 2)}
+        tokens.extend(UserSearchToken(user_id=user_id, token=token) for token in grams)
+        if len(tokens) >= 5000:
+            UserSearchToken.objects.bulk_create(tokens, ignore_conflicts=True)
+            tokens = []
+    UserSearchToken.objects.bulk_create(tokens, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SocialCore', '0004_friendrequest_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=3)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('token', 'user'), name='unique_user_search_token')],
+            },
+        ),
+        migrations.RunPython(backfill_search_tokens, migrations.RunPython.noop),
+    ]
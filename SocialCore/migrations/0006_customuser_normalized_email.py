@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+def backfill_normalized_email(apps, schema_editor):
+    """
+    Populates `normalized_email` with the lowercased email of every existing user.
+    """
+    CustomUser = apps.get_model('SocialCore', 'CustomUser')
+    users = []
+    for user in CustomUser.objects.only('id', 'email').iterator(chunk_size=1000):
+        user.normalized_email = user.email.strip().lower()
+        users.append(user)
+        if len(users) >= 1000:
+            CustomUser.objects.bulk_update(users, ['normalized_email'])
+            users = []
+    CustomUser.objects.bulk_update(users, ['normalized_email'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SocialCore', '0005_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='normalized_email',
+            field=models.CharField(editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_email, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customuser',
+            name='normalized_email',
+            field=models.CharField(editable=False, max_length=254, unique=True),
+        ),
+    ]
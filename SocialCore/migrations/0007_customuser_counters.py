@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-17 14:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Computes `friend_count` and `pending_incoming_count` of every existing user, 1000 users at a time.
+    """
+    CustomUser = apps.get_model('SocialCore', 'CustomUser')
+    Friendship = apps.get_model('SocialCore', 'Friendship')
+    FriendRequest = apps.get_model('SocialCore', 'FriendRequest')
+    friend_count = Subquery(
+        Friendship.objects.filter(user=OuterRef('pk')).values('user').annotate(count=Count('*')).values('count')
+    )
+    pending_incoming_count = Subquery(
+        FriendRequest.objects.filter(to_user=OuterRef('pk'), status='pending')
+        .values('to_user').annotate(count=Count('*')).values('count')
+    )
+    last_id = 0
+    while True:
+        ids = list(CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:1000])
+        if not ids:
+            break
+        CustomUser.objects.filter(pk__in=ids).update(
+            friend_count=Coalesce(friend_count, 0),
+            pending_incoming_count=Coalesce(pending_incoming_count, 0),
+        )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SocialCore', '0006_customuser_normalized_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='friend_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='pending_incoming_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SocialCore', '0007_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='friendrequest',
+            name='action',
+            field=models.CharField(default='friend_request', max_length=32),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from collections import Counter, defaultdict
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models import F
 
 class CustomUserManager(BaseUserManager):
     """
@@ -80,8 +83,14 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     Attributes:
         email (EmailField): The user's email address, used as the unique identifier.
+        normalized_email (CharField): Lowercased copy of `email`, kept in sync on save, 
+            so case-insensitive email lookups can use an equality match on a unique index.
         first_name (CharField): Optional field for the user's first name.
         last_name (CharField): Optional field for the user's last name.
+        friend_count (IntegerField): Number of friends, maintained by `Friendship.create_pairs` and user deletion.
+        pending_incoming_count (IntegerField): Number of pending friend requests received,
+            maintained by `FriendRequest` as requests are sent and answered, and by the
+            delete signal handlers as requests and users are deleted.
         is_active (BooleanField): Indicates whether the user is active.
         is_staff (BooleanField): Indicates whether the user has staff privileges.
         objects (CustomUserManager): The custom user manager for handling user creation.
@@ -92,8 +101,11 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     """
 
     email = models.EmailField(unique=True, db_index=True)  # Email field, indexed and unique
+    normalized_email = models.CharField(max_length=254, unique=True, editable=False)  # Lowercased email for case-insensitive lookups
     first_name = models.CharField(max_length=30, blank=True)  # Optional first name
     last_name = models.CharField(max_length=30, blank=True)   # Optional last name
+    friend_count = models.IntegerField(default=0, editable=False)  # Denormalized number of friends
+    pending_incoming_count = models.IntegerField(default=0, editable=False)  # Denormalized number of pending requests received
     is_active = models.BooleanField(default=True)  # Active status
     is_staff = models.BooleanField(default=False)  # Staff status (for admin panel access)
 
@@ -104,6 +116,60 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []  # No other required fields
 
+    # Updated in place with F() expressions only, never written back from an instance
+    COUNTER_FIELDS = ('friend_count', 'pending_incoming_count')
+
+    @staticmethod
+    def normalize_email_key(email):
+        """
+        Return the canonical form of an email address used for lookups.
+
+        Args:
+            email (str): An email address.
+
+        Returns:
+            str: The email address stripped and lowercased.
+        """
+        return email.strip().lower()
+
+    @classmethod
+    def adjust_counts(cls, field, deltas):
+        """
+        Atomically adds to one of the counters of several users.
+
+        Users with the same delta are updated together, so the usual cases
+        take a single UPDATE.
+
+        Args:
+            field (str): One of `COUNTER_FIELDS`.
+            deltas (dict): Amount to add, keyed by user ID.
+        """
+        user_ids_by_delta = defaultdict(list)
+        for user_id, delta in deltas.items():
+            if delta:
+                user_ids_by_delta[delta].append(user_id)
+        for delta, user_ids in user_ids_by_delta.items():
+            cls.objects.filter(pk__in=user_ids).update(**{field: F(field) + delta})
+
+    def save(self, *args, **kwargs):
+        """
+        Save the user, keeping `normalized_email` in sync with `email`.
+
+        Updates of existing users leave the counters out, so saving an
+        instance loaded earlier cannot overwrite concurrent increments.
+        """
+        self.normalized_email = self.normalize_email_key(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_email'}
+        elif update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         """
         Return a string representation of the user.
@@ -119,6 +185,12 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
+from django.db import transaction
+
+from .caching import friend_list_cache
+from .recommendations import friend_graph
+from .ratelimit import get_rate_limit, get_rate_limiter
+
 class FriendRequest(models.Model):
     """
     Model to represent a friend request between two users.
@@ -128,26 +200,239 @@ class FriendRequest(models.Model):
         to_user (ForeignKey): The user who received the friend request.
         created_at (DateTimeField): The date and time when the request was created.
         status (CharField): The status of the request, either 'pending', 'accepted', or 'rejected'.
+        action (CharField): The `RATE_LIMITS` entry the request was counted against when sent.
     """
     from_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='sent_requests', on_delete=models.CASCADE)
     to_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='received_requests', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], default='pending')
+    action = models.CharField(max_length=32, default='friend_request')
+
+    class Meta:
+        indexes = [
+            # Rate limit check in `can_send_request`
+            models.Index(fields=['from_user', 'created_at'], name='friendreq_from_created_idx'),
+            # Duplicate check in `FriendRequestSerializer.validate`
+            models.Index(fields=['from_user', 'to_user', 'status'], name='friendreq_from_to_status_idx'),
+            # Pending list in `FriendListView`
+            models.Index(fields=['to_user', 'status'], name='friendreq_to_status_idx'),
+        ]
 
     def __str__(self):
         return f"Friend request from {self.from_user.email} to {self.to_user.email}"
 
+    def save(self, *args, **kwargs):
+        """
+        Save the request, counting a new pending request in its receiver's `pending_incoming_count`.
+        """
+        if not (self._state.adding and self.status == 'pending'):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            CustomUser.adjust_counts('pending_incoming_count', {self.to_user_id: 1})
+
+    @classmethod
+    def send_many(cls, from_user, to_user_ids):
+        """
+        Creates pending friend requests from one user to several others with one insert.
+
+        Args:
+            from_user (User): The sender of the requests.
+            to_user_ids (list): IDs of the receivers.
+
+        Returns:
+            list: The created friend requests.
+        """
+        with transaction.atomic():
+            friend_requests = cls.objects.bulk_create(
+                [cls(from_user=from_user, to_user_id=to_user_id, action='friend_request_bulk') for to_user_id in to_user_ids]
+            )
+            CustomUser.adjust_counts('pending_incoming_count', Counter(to_user_ids))
+        return friend_requests
+
     @classmethod
-    def can_send_request(cls, from_user):
+    def can_send_request(cls, from_user, count=1, action='friend_request'):
         """
         Checks if a user can send more friend requests.
+
+        Uses the cache-backed rate limiter when one is configured, which also
+        records the attempt. Otherwise counts the user's recent requests sent
+        under the same action in the database, so single and batched requests
+        are limited separately either way.
         
         Args:
             from_user (User): The user trying to send a friend request.
+            count (int): Number of requests the user is trying to send at once.
+            action (str): The `RATE_LIMITS` entry to check, e.g. 'friend_request_bulk' for batches.
         
         Returns:
-            bool: True if the user can send more requests, False otherwise.
+            bool: True if the user can send that many more requests, False otherwise.
+        """
+        limiter = get_rate_limiter(action)
+        if limiter is not None:
+            return limiter.hit(from_user.pk, cost=count)
+        rate = get_rate_limit(action)
+        window_start = timezone.now() - timedelta(seconds=rate['window'])
+        sent_requests_count = cls.objects.filter(from_user=from_user, action=action, created_at__gte=window_start).count()
+        return sent_requests_count + count <= rate['limit']
+
+    @classmethod
+    def respond(cls, friend_request_id, to_user, action_status):
+        """
+        Accepts or rejects a pending friend request received by `to_user`.
+
+        The status is changed with a single conditional UPDATE, so of several
+        concurrent calls for the same request exactly one succeeds. Accepting
+        also creates the friendship in the same transaction.
+
+        Args:
+            friend_request_id (int): The ID of the friend request.
+            to_user (User): The user acting on the request; must be its receiver.
+            action_status (str): Either 'accepted' or 'rejected'.
+
+        Returns:
+            int: The ID of the request's sender, or None if no pending request
+            with that ID was received by `to_user`.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(id=friend_request_id, to_user=to_user, status='pending').update(status=action_status)
+            if not updated:
+                return None
+            from_user_id = cls.objects.filter(id=friend_request_id).values_list('from_user_id', flat=True).get()
+            if action_status == 'accepted':
+                Friendship.create_pair(from_user_id, to_user.pk)
+            CustomUser.adjust_counts('pending_incoming_count', {to_user.pk: -1})
+        return from_user_id
+
+    @classmethod
+    def respond_many(cls, to_user, action_status, ids=None, before=None):
+        """
+        Accepts or rejects several pending friend requests received by `to_user`.
+
+        The matching requests are locked and then updated with a single UPDATE.
+        Accepting also creates all the friendships in the same transaction.
+
+        Args:
+            to_user (User): The user acting on the requests; must be their receiver.
+            action_status (str): Either 'accepted' or 'rejected'.
+            ids (list, optional): IDs of the requests to act on.
+            before (datetime, optional): Act on all requests created before this time.
+
+        Returns:
+            dict: Sender IDs of the updated requests, keyed by request ID.
+        """
+        pending = cls.objects.filter(to_user=to_user, status='pending')
+        if ids is not None:
+            pending = pending.filter(id__in=ids)
+        if before is not None:
+            pending = pending.filter(created_at__lt=before)
+
+        with transaction.atomic():
+            senders = dict(pending.select_for_update().values_list('id', 'from_user_id'))
+            if senders:
+                cls.objects.filter(id__in=senders).update(status=action_status)
+                if action_status == 'accepted':
+                    Friendship.create_pairs([(from_user_id, to_user.pk) for from_user_id in senders.values()])
+                CustomUser.adjust_counts('pending_incoming_count', {to_user.pk: -len(senders)})
+        return senders
+
+
+class Friendship(models.Model):
+    """
+    Model to represent one direction of an accepted friendship.
+
+    Every accepted friend request is stored as two rows, (A, B) and (B, A),
+    so that a user's friends can be read with a single indexed lookup on
+    `user` instead of scanning friend requests in both directions.
+
+    Attributes:
+        user (ForeignKey): The user owning this side of the friendship.
+        friend (ForeignKey): The user who is a friend of `user`.
+        created_at (DateTimeField): The date and time when the friendship was created.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='friendships', on_delete=models.CASCADE)
+    friend = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='friend_of', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'friend'], name='unique_friendship_edge'),
+        ]
+
+    def __str__(self):
+        return f"Friendship from {self.user_id} to {self.friend_id}"
+
+    @classmethod
+    def create_pair(cls, user_id, friend_id):
         """
-        one_minute_ago = timezone.now() - timedelta(minutes=1)
-        sent_requests_count = cls.objects.filter(from_user=from_user, created_at__gte=one_minute_ago).count()
-        return sent_requests_count < 3
+        Creates both directions of a friendship, ignoring edges that already exist.
+
+        The cached friend lists of both users are invalidated once the
+        surrounding transaction commits.
+
+        Args:
+            user_id (int): ID of one of the users.
+            friend_id (int): ID of the other user.
+        """
+        cls.create_pairs([(user_id, friend_id)])
+
+    @classmethod
+    def create_pairs(cls, pairs):
+        """
+        Creates both directions of several friendships with one insert.
+
+        The `friend_count` of both users of every new friendship is
+        incremented in the same transaction; friendships that already exist
+        are skipped. The users are locked first, so concurrent calls for the
+        same users cannot both count the same friendship.
+
+        Once the surrounding transaction commits, the friendships are added
+        to the in-process friend graph used for suggestions.
+
+        Args:
+            pairs (list): (user_id, friend_id) tuples.
+        """
+        user_ids = {user_id for pair in pairs for user_id in pair}
+        with transaction.atomic():
+            list(CustomUser.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+            existing = set(
+                cls.objects.select_for_update()
+                .filter(user_id__in=user_ids, friend_id__in=user_ids)
+                .values_list('user_id', 'friend_id')
+            )
+            new_pairs = {
+                (min(pair), max(pair)) for pair in pairs
+                if pair[0] != pair[1] and tuple(pair) not in existing
+            }
+            edges = []
+            for user_id, friend_id in new_pairs:
+                edges.append(cls(user_id=user_id, friend_id=friend_id))
+                edges.append(cls(user_id=friend_id, friend_id=user_id))
+            cls.objects.bulk_create(edges, ignore_conflicts=True)
+            CustomUser.adjust_counts('friend_count', Counter(user_id for pair in new_pairs for user_id in pair))
+        transaction.on_commit(lambda: friend_list_cache.invalidate(*user_ids))
+        transaction.on_commit(lambda: friend_graph.add_friendships(pairs))
+
+
+class UserSearchToken(models.Model):
+    """
+    Model to represent one entry of the user search index.
+
+    Each row links a lowercase trigram to a user whose email, first name or
+    last name contains it. The rows for one trigram form its posting list.
+
+    Attributes:
+        user (ForeignKey): The indexed user.
+        token (CharField): A trigram of one of the user's searchable fields.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='search_tokens', on_delete=models.CASCADE)
+    token = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            # Leading on token, so the constraint's index doubles as the posting lists
+            models.UniqueConstraint(fields=['token', 'user'], name='unique_user_search_token'),
+        ]
+
+    def __str__(self):
+        return f"Search token {self.token!r} for {self.user_id}"
@@ -0,0 +1,53 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor based pagination keyed on the primary key.
+
+    Each page is fetched with `WHERE id > <cursor> ORDER BY id LIMIT n`, so
+    its cost does not grow with the depth of the page, unlike the `OFFSET`
+    used by page number pagination. The total count is only computed when
+    the client asks for it with `?count=true`.
+    """
+    ordering = 'id'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = {'count': self.count, **response.data}
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
+
+
+class PaginationModeMixin:
+    """
+    Lets clients switch a list view to keyset pagination with `?pagination=cursor`.
+
+    The view's own `pagination_class` is used otherwise.
+    """
+    pagination_mode_query_param = 'pagination'
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get(self.pagination_mode_query_param) == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
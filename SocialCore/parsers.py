@@ -0,0 +1,44 @@
+"""
+Parsers for SocialCore requests.
+
+`FastJSONParser` is a drop-in replacement for DRF's `JSONParser` that decodes
+with `orjson` when it is installed and falls back to the standard library
+otherwise.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """
+    `JSONParser` decoding with `orjson` when available.
+
+    Like `JSONParser` in its default strict mode, NaN and infinite values are rejected.
+
+    Attributes:
+        use_orjson (bool): Whether `orjson` is used; defaults to whether it is installed.
+    """
+    renderer_class = FastJSONRenderer
+    use_orjson = orjson is not None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not self.use_orjson or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            # orjson reads UTF-8 bytes directly; other encodings are decoded first
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
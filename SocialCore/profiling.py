@@ -0,0 +1,141 @@
+"""
+Slow query capture.
+
+Every query issued from SocialCore code that takes at least
+`SLOW_QUERY_THRESHOLD` seconds is captured with its SQL, parameters and
+`EXPLAIN` output, and tagged with the SocialCore function that issued it
+(a view, serializer or model method) and the SocialCore frames leading to
+it. Queries issued only by Django itself or third-party apps are ignored.
+
+Captures are kept in a ring buffer of the last `SLOW_QUERY_BUFFER_SIZE`
+queries, served at `/metrics/`, and logged as JSON lines to the
+`SocialCore.profiling` logger, which settings route to a rotating file.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames from these modules are plumbing or tests, not the origin of a query
+IGNORED_FILES = {os.path.join(PACKAGE_DIR, name) for name in ('profiling.py', 'instrumentation.py', 'tests.py')}
+IGNORED_DIRS = (os.path.join(PACKAGE_DIR, 'db') + os.sep,)
+MAX_STACK_FRAMES = 8
+
+_explaining = ContextVar('explaining_slow_query', default=False)
+
+
+def query_origin():
+    """
+    Returns the SocialCore frames of the current stack, innermost first, as "path:line in function" strings.
+    """
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < MAX_STACK_FRAMES:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_DIR) and filename not in IGNORED_FILES and not filename.startswith(IGNORED_DIRS):
+            code = frame.f_code
+            function = getattr(code, 'co_qualname', code.co_name)
+            frames.append(f'{os.path.relpath(filename, os.path.dirname(PACKAGE_DIR))}:{frame.f_lineno} in {function}')
+        frame = frame.f_back
+    return frames
+
+
+def explain(connection, sql, params):
+    """
+    Returns the rows of the database's query plan for a statement, or the error that prevented it.
+    """
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [list(row) for row in cursor.fetchall()]
+    except Exception as exc:
+        return f'EXPLAIN failed: {exc}'
+    finally:
+        _explaining.reset(token)
+
+
+class SlowQueryLog:
+    """
+    Ring buffer of the latest slow queries.
+
+    Args:
+        size (int): Maximum number of captures kept.
+    """
+
+    def __init__(self, size):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def capture(self, connection, sql, params, many, duration):
+        """
+        Records a slow query, if it was issued from SocialCore code.
+
+        Args:
+            connection (BaseDatabaseWrapper): The connection that ran the query.
+            sql (str): The statement, with placeholders.
+            params: The statement's parameters, or a list of parameter sets for `executemany`.
+            many (bool): Whether the statement was run with `executemany`.
+            duration (float): The query's duration, in seconds.
+
+        Returns:
+            dict: The capture, or None if the query did not come from SocialCore.
+        """
+        stack = query_origin()
+        if not stack:
+            return None
+        # Only plain reads are explained: EXPLAIN of a write may run it on some backends
+        readonly = not many and sql.lstrip()[:6].upper() in ('SELECT', 'WITH')
+        entry = {
+            'time': timezone.now().isoformat(),
+            'database': connection.alias,
+            'duration': duration,
+            'origin': stack[0].rsplit(' in ', 1)[1],
+            'stack': stack,
+            'sql': sql,
+            'params': f'{len(params)} parameter sets' if many else (list(params) if params is not None else None),
+            'explain': explain(connection, sql, params) if readonly else None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+        logger.info(json.dumps(entry, default=str))
+        return entry
+
+    def entries(self):
+        """
+        Returns the captured queries, oldest first.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(size=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 100))
+
+
+def slow_query_recorder(execute, sql, params, many, context):
+    """
+    Database execute wrapper capturing queries slower than `SLOW_QUERY_THRESHOLD` seconds.
+    """
+    threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD', 0.1)
+    if threshold <= 0 or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration >= threshold:
+        slow_query_log.capture(context['connection'], sql, params, many, duration)
+    return result
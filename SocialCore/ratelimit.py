@@ -0,0 +1,116 @@
+"""
+Rate limiting for user actions, backed by Django's cache framework.
+
+Limits are configured per action in the `RATE_LIMITS` setting, e.g.::
+
+    RATE_LIMITS = {
+        'friend_request': {'limit': 3, 'window': 60},
+    }
+
+Counters live in the cache named by `RATE_LIMIT_CACHE`, which must be shared
+by all workers and have an atomic `incr`: the default 'shared'
+`AtomicFileBasedCache` on one host, or Memcached or Redis across hosts. A
+`LocMemCache` keeps separate counters in every worker, multiplying the
+effective limit by the number of workers, and the `incr` of `FileBasedCache`
+and `DatabaseCache` is a non-atomic read and write, so concurrent hits may
+be lost. When `RATE_LIMIT_CACHE` is empty, `get_rate_limiter` returns None
+and callers fall back to counting rows in the database, one query per check.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding window counter rate limiter.
+
+    Keeps one counter per fixed window and estimates the number of hits in
+    the sliding window ending now as the current counter plus the previous
+    counter weighted by how much of the previous window is still covered.
+
+    The check and the increment are combined: the counter is incremented
+    first with the cache's `incr`, and rolled back if the estimate exceeds the
+    limit. With a cache whose `incr` is atomic, such as Memcached or Redis,
+    concurrent callers therefore cannot all slip under the limit.
+
+    Attributes:
+        action (str): Name of the limited action, used in cache keys.
+        limit (int): Maximum number of hits allowed per window.
+        window (int): Window length in seconds.
+        cache (BaseCache): Cache holding the counters.
+    """
+
+    key_prefix = 'ratelimit'
+
+    def __init__(self, action, limit, window, cache):
+        self.action = action
+        self.limit = limit
+        self.window = window
+        self.cache = cache
+
+    def _key(self, identifier, window_index):
+        return f'{self.key_prefix}:{self.action}:{identifier}:{window_index}'
+
+    def hit(self, identifier, cost=1):
+        """
+        Records `cost` hits for `identifier` if they all fit within the limit.
+
+        Args:
+            identifier: Value identifying the caller, e.g. a user ID.
+            cost (int): Number of hits to record at once, e.g. the size of a batch.
+
+        Returns:
+            bool: True if the hits were allowed and recorded, False otherwise.
+        """
+        now = time.time()
+        window_index = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        current_key = self._key(identifier, window_index)
+
+        # Counters must outlive the following window, where they are the "previous" counter
+        self.cache.add(current_key, 0, timeout=self.window * 2)
+        try:
+            current = self.cache.incr(current_key, cost)
+        except ValueError:
+            # The key expired between add() and incr()
+            self.cache.set(current_key, cost, timeout=self.window * 2)
+            current = cost
+        previous = self.cache.get(self._key(identifier, window_index - 1), 0)
+
+        if previous * (1 - elapsed) + current > self.limit:
+            self.cache.decr(current_key, cost)
+            return False
+        return True
+
+
+def get_rate_limit(action):
+    """
+    Returns the configured limit for an action.
+
+    Args:
+        action (str): Name of the limited action.
+
+    Returns:
+        dict: The action's settings, with 'limit' and 'window' (seconds) keys.
+    """
+    return settings.RATE_LIMITS[action]
+
+
+def get_rate_limiter(action):
+    """
+    Returns a cache-backed rate limiter for an action.
+
+    Args:
+        action (str): Name of the limited action.
+
+    Returns:
+        SlidingWindowRateLimiter: The limiter, or None if no rate limit cache is
+        configured and the caller should fall back to the database.
+    """
+    cache_alias = getattr(settings, 'RATE_LIMIT_CACHE', '')
+    if not cache_alias:
+        return None
+    rate = get_rate_limit(action)
+    return SlidingWindowRateLimiter(action, rate['limit'], rate['window'], caches[cache_alias])
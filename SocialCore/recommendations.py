@@ -0,0 +1,275 @@
+"""
+Mutual friends and "people you may know" suggestions.
+
+Accepted friendships are loaded from `Friendship` into an in-process graph in
+compressed sparse row form: one array of offsets indexed by user ID and one
+array holding every user's friend IDs, sorted. A user's friends are a slice
+of that array, so the whole graph costs a few bytes per edge instead of a
+Python object per edge.
+
+Suggestions for a user are the friends of their friends, ranked by the number
+of mutual friends, i.e. the size of the intersection of both friend lists.
+Friendships created and users deleted after the graph was built are kept in a
+small overlay and merged into every lookup; the graph is rebuilt from the
+database in a background thread once it is older than `FRIEND_GRAPH_MAX_AGE`
+seconds.
+"""
+import heapq
+import logging
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import accumulate
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+
+logger = logging.getLogger(__name__)
+
+
+def _id_typecode(max_id):
+    # 4-byte IDs halve the size of the graph whenever they are enough
+    return 'i' if max_id < 2 ** 31 else 'q'
+
+
+class FriendGraph:
+    """
+    Immutable adjacency of accepted friendships, plus an overlay of newer edges.
+
+    Attributes:
+        offsets (array): `offsets[u]:offsets[u + 1]` delimits the friends of user `u` in `neighbors`.
+        neighbors (array): The sorted friend IDs of every user, one user after the other.
+        built_at (float): `time.monotonic()` when the graph was built.
+    """
+
+    def __init__(self, offsets, neighbors):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.built_at = time.monotonic()
+        self._added = {}  # User ID -> frozenset of friend IDs added since the build
+        self._removed = frozenset()  # IDs of users deleted since the build
+
+    @classmethod
+    def from_sorted_rows(cls, rows, max_id):
+        """
+        Builds a graph from directed edges ordered by (user ID, friend ID).
+
+        Args:
+            rows (iterable): (user_id, friend_id) tuples, in order.
+            max_id (int): The largest user ID.
+
+        Returns:
+            FriendGraph: The graph.
+        """
+        degrees = array('q', bytes(8 * (max_id + 2)))
+        neighbors = array(_id_typecode(max_id))
+        for user_id, friend_id in rows:
+            neighbors.append(friend_id)
+            degrees[user_id + 1] += 1
+        return cls(array('q', accumulate(degrees)), neighbors)
+
+    @classmethod
+    def from_edges(cls, users, friends, max_id):
+        """
+        Builds a graph from directed edges in any order.
+
+        Edges are placed with a counting sort on the user ID, then every
+        friend list is sorted.
+
+        Args:
+            users (sequence): User ID of every edge.
+            friends (sequence): Friend ID of every edge.
+            max_id (int): The largest user ID.
+
+        Returns:
+            FriendGraph: The graph.
+        """
+        typecode = _id_typecode(max_id)
+        degrees = array('q', bytes(8 * (max_id + 2)))
+        for user_id in users:
+            degrees[user_id + 1] += 1
+        offsets = array('q', accumulate(degrees))
+        cursors = array('q', offsets)
+        neighbors = array(typecode, bytes(array(typecode).itemsize * len(users)))
+        for user_id, friend_id in zip(users, friends):
+            neighbors[cursors[user_id]] = friend_id
+            cursors[user_id] += 1
+        for user_id in range(max_id + 1):
+            start, end = offsets[user_id], offsets[user_id + 1]
+            if end - start > 1:
+                neighbors[start:end] = array(typecode, sorted(neighbors[start:end]))
+        return cls(offsets, neighbors)
+
+    @classmethod
+    def load(cls, using='default'):
+        """
+        Builds the graph of all friendships stored in the database.
+
+        The rows are streamed in the order of the unique (user, friend) index.
+        """
+        Friendship = apps.get_model('SocialCore', 'Friendship')
+        User = apps.get_model(settings.AUTH_USER_MODEL)
+        max_id = User.objects.using(using).aggregate(max_id=Max('id'))['max_id'] or 0
+        rows = (
+            Friendship.objects.using(using).order_by('user_id', 'friend_id')
+            .values_list('user_id', 'friend_id').iterator(chunk_size=10000)
+        )
+        return cls.from_sorted_rows(rows, max_id)
+
+    @property
+    def size_in_bytes(self):
+        return self.offsets.itemsize * len(self.offsets) + self.neighbors.itemsize * len(self.neighbors)
+
+    def add_friendships(self, pairs):
+        """
+        Adds both directions of new friendships to the overlay.
+
+        Args:
+            pairs (iterable): (user_id, friend_id) tuples.
+        """
+        for user_id, friend_id in pairs:
+            # Replace rather than mutate the sets, so concurrent readers never see them change
+            self._added[user_id] = self._added.get(user_id, frozenset()) | {friend_id}
+            self._added[friend_id] = self._added.get(friend_id, frozenset()) | {user_id}
+
+    def remove_users(self, user_ids):
+        """
+        Drops deleted users from every friend list.
+
+        Args:
+            user_ids (iterable): IDs of the deleted users.
+        """
+        self._removed = self._removed.union(user_ids)
+
+    def friends(self, user_id):
+        """
+        Returns the sorted friend IDs of a user.
+        """
+        if user_id + 1 < len(self.offsets):
+            friends = self.neighbors[self.offsets[user_id]:self.offsets[user_id + 1]]
+        else:
+            friends = ()
+        added = self._added.get(user_id)
+        if added:
+            friends = sorted(added.union(friends))
+        removed = self._removed
+        if removed:
+            return [friend_id for friend_id in friends if friend_id not in removed]
+        return friends
+
+    def mutual_friends(self, user_id, other_id):
+        """
+        Returns the sorted IDs of the friends two users have in common.
+        """
+        return sorted(set(self.friends(user_id)).intersection(self.friends(other_id)))
+
+    def suggest(self, user_id, limit=10, exclude=()):
+        """
+        Returns the friends of a user's friends with the most mutual friends.
+
+        Counting how often each user appears in the friend lists of the
+        user's friends gives, for every candidate at once, the size of the
+        intersection of its friend list with the user's.
+
+        Args:
+            user_id (int): The user to suggest friends to.
+            limit (int): Maximum number of suggestions.
+            exclude (iterable): IDs of users not to suggest.
+
+        Returns:
+            list: (user_id, mutual_friend_count) tuples, most mutual friends first, then by ID.
+        """
+        friends = self.friends(user_id)
+        counts = Counter()
+        for friend_id in friends:
+            counts.update(self.friends(friend_id))
+        for excluded_id in (user_id, *friends, *exclude):
+            counts.pop(excluded_id, None)
+        return heapq.nlargest(limit, counts.items(), key=lambda item: (item[1], -item[0]))
+
+
+class FriendGraphCache:
+    """
+    Holds the friend graph of this process, rebuilding it when it gets too old.
+
+    The first graph is built by the first caller, which waits for it. Later
+    rebuilds run in a background thread while every caller keeps using the
+    previous graph.
+    """
+
+    def __init__(self):
+        self._graph = None
+        self._lock = threading.Lock()  # Guards the graph, its overlay and `_pending`
+        self._build_lock = threading.Lock()  # Held while a graph is loading
+        self._pending = None  # Changes made while a rebuild is loading, as callables taking the graph
+        self._rebuild_thread = None
+
+    def get(self):
+        """
+        Returns the current friend graph, building it on first use.
+        """
+        graph = self._graph
+        if graph is None:
+            with self._build_lock:
+                if self._graph is None:
+                    self._rebuild()
+            return self._graph
+        max_age = getattr(settings, 'FRIEND_GRAPH_MAX_AGE', 600)
+        if time.monotonic() - graph.built_at > max_age and self._build_lock.acquire(blocking=False):
+            self._rebuild_thread = threading.Thread(target=self._rebuild_in_background, name='friend-graph-rebuild', daemon=True)
+            self._rebuild_thread.start()
+        return graph
+
+    def _rebuild(self):
+        with self._lock:
+            self._pending = []
+        try:
+            rebuilt = FriendGraph.load()
+            with self._lock:
+                # Changes committed during the load may be missing from it
+                for change in self._pending:
+                    change(rebuilt)
+                self._graph = rebuilt
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _rebuild_in_background(self):
+        try:
+            self._rebuild()
+        except Exception:
+            logger.exception('Rebuilding the friend graph failed')
+        finally:
+            connections.close_all()
+            self._build_lock.release()
+
+    def _apply(self, change):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(change)
+            if self._graph is not None:
+                change(self._graph)
+
+    def add_friendships(self, pairs):
+        """
+        Adds new friendships to the current graph, if one has been built.
+        """
+        pairs = list(pairs)
+        self._apply(lambda graph: graph.add_friendships(pairs))
+
+    def remove_users(self, user_ids):
+        """
+        Removes deleted users from the current graph, if one has been built.
+        """
+        user_ids = list(user_ids)
+        self._apply(lambda graph: graph.remove_users(user_ids))
+
+    def clear(self):
+        with self._lock:
+            self._graph = None
+
+
+friend_graph = FriendGraphCache()
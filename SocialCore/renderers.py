@@ -0,0 +1,159 @@
+"""
+Renderers for SocialCore responses.
+
+`FastJSONRenderer` is a drop-in replacement for DRF's `JSONRenderer`. It
+encodes with `orjson` when it is installed and falls back to the standard
+library otherwise. Either way it produces JSON equivalent to that of
+`JSONRenderer`, and the same bytes unless the data holds floats written with
+an exponent, which `orjson` formats without a plus sign or leading zeros
+(`1e16` rather than `1e+16`).
+"""
+import json
+import secrets
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+METRIC_PREFIX = 'socialcore'
+
+
+class JSONFragment:
+    """
+    Already encoded JSON, inserted verbatim by `FastJSONRenderer`.
+
+    Lets cached, pre-rendered parts of a response be embedded in it without
+    being decoded and encoded again.
+
+    Args:
+        content (bytes or str): A complete JSON value.
+    """
+    __slots__ = ('content',)
+
+    def __init__(self, content):
+        self.content = content.encode() if isinstance(content, str) else content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` producing equivalent output faster, with `orjson` when available.
+
+    Types JSON has no representation for (such as datetime, Decimal and UUID)
+    are encoded the way DRF's `JSONEncoder` encodes them. Indented or ASCII-only
+    output, which `orjson` does not produce, is left to `JSONRenderer`, and so
+    is data `orjson` cannot encode, such as integers wider than 64 bits. One
+    difference remains: `orjson` encodes NaN and infinite floats as null where
+    `JSONRenderer` raises.
+
+    Attributes:
+        use_orjson (bool): Whether `orjson` is used; defaults to whether it is installed.
+    """
+    use_orjson = orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if not self.use_orjson:
+            try:
+                return super().render(data, accepted_media_type, renderer_context)
+            except TypeError:
+                pass  # Fragments, which JSONRenderer cannot encode
+
+        encoder = self.encoder_class()
+        fragments = []
+        nonce = None
+
+        def default(obj):
+            nonlocal nonce
+            if isinstance(obj, JSONFragment):
+                # Encoded as a unique placeholder string, then swapped for the fragment
+                nonce = nonce or secrets.token_hex(8)
+                fragments.append(obj.content)
+                return f'\0{nonce}:{len(fragments) - 1}\0'
+            return encoder.default(obj)
+
+        ret = None
+        if self.use_orjson:
+            # Dates are passed to `default` so that they are formatted like DRF does
+            options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            try:
+                ret = orjson.dumps(data, default=default, option=options)
+            except orjson.JSONEncodeError:
+                fragments.clear()
+        if ret is None:
+            ret = json.dumps(
+                data, default=default, ensure_ascii=False, allow_nan=not self.strict, separators=(',', ':'),
+            ).encode()
+
+        # Like JSONRenderer, escape the line separators that are invalid in JavaScript strings
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        for index, content in enumerate(fragments):
+            ret = ret.replace(f'"\\u0000{nonce}:{index}\\u0000"'.encode(), content, 1)
+        return ret
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_label(value)}"' for name, value in labels.items()) + '}'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """
+    Renders the output of `MetricsView` in the Prometheus text exposition format.
+
+    Request histograms become `socialcore_request_<metric>` histograms
+    labelled by URL name. Every other group of numeric stats becomes gauges
+    named `socialcore_<group>_<stat>`, labelled by database alias for the
+    connection pools.
+    """
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        lines = []
+        requests = data.get('requests', {})
+
+        histograms = sorted({name for metrics in requests.values() for name, value in metrics.items() if 'buckets' in value})
+        for name in histograms:
+            metric = f'{METRIC_PREFIX}_request_{name}'
+            lines.append(f'# TYPE {metric} histogram')
+            for url_name, metrics in sorted(requests.items()):
+                histogram = metrics[name]
+                for bound, count in histogram['buckets']:
+                    lines.append(f'{metric}_bucket{_labels(url_name=url_name, le=bound)} {count}')
+                lines.append(f'{metric}_sum{_labels(url_name=url_name)} {histogram["sum"]}')
+                lines.append(f'{metric}_count{_labels(url_name=url_name)} {histogram["count"]}')
+
+        if requests:
+            metric = f'{METRIC_PREFIX}_request_slowest_query_seconds'
+            lines.append(f'# TYPE {metric} gauge')
+            for url_name, metrics in sorted(requests.items()):
+                lines.append(f'{metric}{_labels(url_name=url_name)} {metrics["slowest_sql"]["seconds"]}')
+
+        for group, stats in data.items():
+            if group == 'requests':
+                continue
+            if not isinstance(stats, dict):
+                stats = {'': stats}
+            # Nested groups, such as the pools, are keyed by database alias
+            rows = [(_labels(alias=alias), values) for alias, values in stats.items() if isinstance(values, dict)]
+            rows.append(('', {key: value for key, value in stats.items() if not isinstance(value, dict)}))
+            gauges = {}
+            for labels, values in rows:
+                for key, value in values.items():
+                    if isinstance(value, (int, float)):
+                        gauges.setdefault('_'.join(filter(None, (METRIC_PREFIX, group, key))), []).append((labels, value))
+            for metric, samples in gauges.items():
+                lines.append(f'# TYPE {metric} gauge')
+                lines.extend(f'{metric}{labels} {float(value)}' for labels, value in samples)
+
+        return '\n'.join(lines) + '\n'
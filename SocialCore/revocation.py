@@ -0,0 +1,214 @@
+"""
+Revocation list for JWTs.
+
+Revoked token IDs (the `jti` claim) are kept in memory until the token would
+have expired anyway: Bloom filters answer the common "not revoked" case
+without touching the exact set, which confirms the rare positives. Checks are
+O(1) and never query the database.
+
+Bloom filters cannot forget keys, so IDs are split into generations by
+expiry, one filter per generation. A generation lasts as long as the
+longest-lived token, so at most two generations hold live IDs, and a
+generation's filter is dropped whole once every ID in it has expired.
+
+Workers share revocations through the Django cache named by
+`TOKEN_REVOCATION_CACHE`, which must be visible to every worker and have an
+atomic `add` and `incr`: the default 'shared' `AtomicFileBasedCache` on one
+host, or Memcached or Redis across hosts. Each revocation is appended to a
+log in that cache under an increasing sequence number, written with `add` so
+that two revocations never share an entry; every worker replays the entries
+it has not seen at most every `TOKEN_REVOCATION_SYNC_INTERVAL` seconds.
+"""
+import hashlib
+import heapq
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = 'token-revocation:seq'
+SYNC_BATCH_SIZE = 1000
+
+
+def entry_key(sequence):
+    return f'token-revocation:{sequence}'
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+
+    Args:
+        capacity (int): Number of keys the filter is sized for.
+        error_rate (float): False positive rate at `capacity` keys.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    In-memory set of revoked token IDs, synchronised between workers through a shared cache.
+
+    Attributes:
+        capacity (int): Number of live revocations each generation's Bloom filter is sized for.
+        generation (float): Length of a generation in seconds, at least the lifetime of any token.
+    """
+
+    def __init__(self, capacity, generation):
+        self.capacity = capacity
+        self.generation = generation
+        self._lock = threading.Lock()
+        self._expiries = {}  # Token ID -> expiry timestamp
+        self._heap = []  # (expiry timestamp, token ID), to drop expired IDs in order
+        self._blooms = {}  # Generation index -> Bloom filter of the IDs expiring during it
+        self._seen = 0  # Last sequence number replayed from the shared log
+        self._retry = set()  # Sequence numbers found missing once, possibly still being written
+        self._next_sync = 0.0
+        self._warned = False
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'TOKEN_REVOCATION_CACHE', '')
+        if not alias:
+            return None
+        cache = caches[alias]
+        if isinstance(cache, LocMemCache) and not self._warned:
+            self._warned = True
+            logger.warning(
+                'TOKEN_REVOCATION_CACHE %r is a LocMemCache: revocations are not shared between '
+                'worker processes, and a token revoked in one is still accepted by the others.', alias,
+            )
+        return cache
+
+    def _add(self, jti, exp):
+        if exp <= time.time():
+            return
+        with self._lock:
+            if self._expiries.get(jti, 0) >= exp:
+                return
+            self._expiries[jti] = exp
+            heapq.heappush(self._heap, (exp, jti))
+            index = int(exp // self.generation)
+            if index not in self._blooms:
+                self._blooms[index] = BloomFilter(self.capacity)
+            self._blooms[index].add(jti)
+
+    def _purge(self):
+        now = time.time()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                exp, jti = heapq.heappop(self._heap)
+                if self._expiries.get(jti) == exp:
+                    del self._expiries[jti]
+            for index in [index for index in self._blooms if (index + 1) * self.generation <= now]:
+                del self._blooms[index]
+
+    def revoke(self, jti, exp):
+        """
+        Revokes a token until its expiry.
+
+        Args:
+            jti (str): The token ID.
+            exp (int): The token's expiry, as a Unix timestamp.
+        """
+        timeout = math.ceil(exp - time.time())
+        if timeout <= 0:
+            return
+        cache = self.cache
+        if cache is not None:
+            cache.add(SEQUENCE_KEY, 0, timeout=None)
+            # Retried if the entry already exists, which means another worker
+            # drew the same sequence number
+            while not cache.add(entry_key(cache.incr(SEQUENCE_KEY)), (jti, exp), timeout=timeout):
+                pass
+        self._add(jti, exp)
+
+    def sync(self, force=False):
+        """
+        Replays revocations logged by other workers since the last sync.
+
+        Does nothing if the last sync is more recent than
+        `TOKEN_REVOCATION_SYNC_INTERVAL` seconds, unless `force` is set.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            self._next_sync = now + getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 1.0)
+            seen, retry = self._seen, self._retry
+
+        cache = self.cache
+        if cache is not None:
+            latest = cache.get(SEQUENCE_KEY, 0)
+            if latest < seen:
+                seen, retry = 0, set()  # The shared cache was cleared
+            sequences = sorted(retry) + list(range(seen + 1, latest + 1))
+            missing = set()
+            for start in range(0, len(sequences), SYNC_BATCH_SIZE):
+                batch = {entry_key(sequence): sequence for sequence in sequences[start:start + SYNC_BATCH_SIZE]}
+                entries = cache.get_many(batch)
+                for key, sequence in batch.items():
+                    if key in entries:
+                        self._add(*entries[key])
+                    elif sequence not in retry:
+                        missing.add(sequence)
+            with self._lock:
+                # A revocation's sequence number is taken before its entry is
+                # written, so entries missing for the first time are retried
+                # once; entries missing twice have expired or been evicted.
+                self._seen, self._retry = latest, missing
+        self._purge()
+
+    def is_revoked(self, jti):
+        """
+        Returns whether a token ID has been revoked and has not expired yet.
+        """
+        self.sync()
+        with self._lock:
+            if not any(jti in bloom for bloom in self._blooms.values()):
+                return False
+            return self._expiries.get(jti, 0) > time.time()
+
+    def stats(self):
+        """
+        Returns the number of live revocations and the size of the Bloom filters in bytes.
+        """
+        with self._lock:
+            return {
+                'revoked': len(self._expiries),
+                'bloom_bytes': sum(len(bloom.bits) for bloom in self._blooms.values()),
+                'generations': len(self._blooms),
+                'sequence': self._seen,
+            }
+
+
+revocation_list = RevocationList(
+    capacity=getattr(settings, 'TOKEN_REVOCATION_CAPACITY', 100000),
+    generation=max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME).total_seconds(),
+)
@@ -0,0 +1,139 @@
+"""
+Trigram search index for users.
+
+Every user's email, first name and last name are split into lowercase
+trigrams stored in `UserSearchToken`, which is kept in sync by the signals in
+`SocialCore.signals`. Writes that send no `post_save` signal, such as
+`QuerySet.update()`, `bulk_update()` or raw SQL, leave the index stale: call
+`index_users` for the changed users afterwards, or run the
+`reindex_user_search` management command. A keyword is answered by intersecting the posting lists
+of its trigrams, then checking the remaining candidates for a real substring
+match, instead of running `LIKE '%keyword%'` over the whole user table.
+
+Email-shaped keywords are first looked up on their own by equality on the
+unique `normalized_email` column; a user found that way is ranked first
+among the trigram matches.
+"""
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from .models import UserSearchToken
+
+User = get_user_model()
+
+NGRAM_SIZE = 3
+SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+
+
+def ngrams(text):
+    """
+    Returns the distinct lowercase trigrams of a string.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        set: Trigrams of `text`, empty if it is shorter than a trigram.
+    """
+    text = text.lower()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def user_ngrams(user):
+    """
+    Returns the trigrams of all searchable fields of a user.
+    """
+    grams = set()
+    for field in SEARCH_FIELDS:
+        grams |= ngrams(getattr(user, field) or '')
+    return grams
+
+
+def index_user(user):
+    """
+    Replaces the search tokens of a user with those of its current field values.
+
+    Args:
+        user (User): The user to index.
+    """
+    index_users([user])
+
+
+def index_users(users):
+    """
+    Replaces the search tokens of several users with those of their current field values.
+
+    Args:
+        users (iterable): The users to index, with their searchable fields loaded.
+    """
+    users = list(users)
+    UserSearchToken.objects.filter(user__in=users).delete()
+    # Conflicts are possible where the column collation folds accents
+    UserSearchToken.objects.bulk_create(
+        [UserSearchToken(user=user, token=token) for user in users for token in user_ngrams(user)],
+        ignore_conflicts=True,
+    )
+
+
+def is_email(keyword):
+    """
+    Returns whether a keyword is shaped like a complete email address.
+    """
+    try:
+        validate_email(keyword)
+    except ValidationError:
+        return False
+    return True
+
+
+def search_users(keyword):
+    """
+    Returns users whose email, first name or last name contains `keyword`.
+
+    Keywords of at least three characters are resolved through the trigram
+    index: users holding every trigram of the keyword are selected with one
+    grouped query over the posting lists, and only those candidates are
+    checked for a substring match. Shorter keywords have no trigrams and fall
+    back to a substring scan. Email-shaped keywords are first looked up on
+    their own, with one query on the `normalized_email` unique index; the user
+    with that exact email (compared case-insensitively), who also matches the
+    keyword as a substring, is ranked first. Results are otherwise ordered by
+    ID. Cursor pagination orders by ID alone, so it does not rank the exact
+    match first.
+
+    Args:
+        keyword (str): The search keyword.
+
+    Returns:
+        QuerySet: The matching users.
+    """
+    matches = (
+        Q(email__icontains=keyword) |
+        Q(first_name__icontains=keyword) |
+        Q(last_name__icontains=keyword)
+    )
+    queryset = User.objects.all()
+
+    grams = ngrams(keyword)
+    if grams:
+        candidates = (
+            UserSearchToken.objects.filter(token__in=grams)
+            .values('user')
+            .annotate(matched=Count('token'))
+            .filter(matched=len(grams))
+            .values('user')
+        )
+        matches &= Q(id__in=candidates)
+
+    queryset = queryset.filter(matches)
+    exact_id = None
+    if is_email(keyword):
+        # Kept out of the WHERE clause, where OR-ing it with the trigram match would defeat both indexes
+        exact_id = User.objects.filter(normalized_email=User.normalize_email_key(keyword)).values_list('id', flat=True).first()
+    if exact_id is None:
+        return queryset.order_by('id')
+    return queryset.annotate(
+        rank=Case(When(id=exact_id, then=Value(0)), default=Value(1), output_field=IntegerField())
+    ).order_by('rank', 'id')
@@ -1,7 +1,25 @@
+from datetime import datetime
+from functools import cached_property
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings as drf_settings
 from django.contrib.auth.password_validation import validate_password
 
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .hashers import check_user_password
+from .instrumentation import timed
+from .ratelimit import get_rate_limit
+from .revocation import revocation_list
+
 # Get the custom user model
 User = get_user_model()
 
@@ -28,7 +46,29 @@ class UserSignupSerializer(serializers.ModelSerializer):
         # fields = ['email', 'password']
         fields = ['id','email', 'password', 'first_name', 'last_name']  # Include first_name and last_name
 
-        extra_kwargs = {'password': {'write_only': True}}  # won't return the password in responses
+        extra_kwargs = {
+            'password': {'write_only': True},  # won't return the password in responses
+            'email': {'validators': []},  # uniqueness is checked case-insensitively in validate_email
+        }
+
+    duplicate_email_message = "custom user with this email already exists."
+
+    def validate_email(self, value):
+        """
+        Rejects an email already registered, in any letter case.
+
+        Args:
+            value (str): The email address to sign up with.
+
+        Returns:
+            str: The email address.
+
+        Raises:
+            serializers.ValidationError: If a user with this email already exists.
+        """
+        if User.objects.filter(normalized_email=User.normalize_email_key(value)).exists():
+            raise serializers.ValidationError(self.duplicate_email_message)
+        return value
 
     def create(self, validated_data):
         """
@@ -39,16 +79,32 @@ class UserSignupSerializer(serializers.ModelSerializer):
 
         Returns:
             User: A new user instance created with the given email and password.
+
+        Raises:
+            serializers.ValidationError: If the email was registered concurrently.
         """
-        user = User.objects.create_user(
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),  # Optional: Provides the default empty string
-            last_name=validated_data.get('last_name', '')  # Optional: Provides the default empty string
-        )
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=validated_data['email'],
+                    password=validated_data['password'],
+                    first_name=validated_data.get('first_name', ''),  # Optional: Provides the default empty string
+                    last_name=validated_data.get('last_name', '')  # Optional: Provides the default empty string
+                )
+        except IntegrityError:
+            raise serializers.ValidationError({'email': [self.duplicate_email_message]})
         return user
 
-class UserLoginSerializer(serializers.Serializer):
+class UserCredentialsSerializer(serializers.Serializer):
+    """
+    Serializer for the email and password of a login attempt, without checking them.
+    """
+
+    email = serializers.EmailField()  # Email field for login
+    password = serializers.CharField(write_only=True)  # Password field, write-only
+
+
+class UserLoginSerializer(UserCredentialsSerializer):
     """
     Serializer for handling user login.
 
@@ -66,8 +122,13 @@ class UserLoginSerializer(serializers.Serializer):
 
     """
 
-    email = serializers.EmailField()  # Email field for login
-    password = serializers.CharField(write_only=True)  # Password field, write-only
+    @staticmethod
+    def get_user_queryset(email):
+        """
+        Returns the queryset of the user logging in with `email`.
+        """
+        # Equality lookup on the unique normalized email, which ignores letter case
+        return User.objects.filter(normalized_email=User.normalize_email_key(email))
 
     def validate(self, data):
         """
@@ -82,14 +143,71 @@ class UserLoginSerializer(serializers.Serializer):
         Raises:
             serializers.ValidationError: If the email or password is invalid.
         """
-        # Look for user by email (case insensitive)
-        user = User.objects.filter(email__iexact=data['email']).first()
-        # Check if the password is correct
-        if user and user.check_password(data['password']):
+        user = self.get_user_queryset(data['email']).first()
+        # Check if the password is correct, upgrading its hash if outdated
+        if user and check_user_password(user, data['password']):
             return user
         raise serializers.ValidationError("Invalid email or password")
 
 
+class UserLogoutSerializer(serializers.Serializer):
+    """
+    Serializer for handling user logout.
+
+    Validates the refresh token to revoke, which must belong to the user logging out.
+
+    Attributes:
+        refresh (CharField): The refresh token issued at login.
+    """
+
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value):
+        """
+        Parses the refresh token.
+
+        Args:
+            value (str): The encoded refresh token.
+
+        Returns:
+            RefreshToken: The validated refresh token.
+
+        Raises:
+            serializers.ValidationError: If the token is invalid, expired or belongs to another user.
+        """
+        try:
+            refresh = RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(self.context['request'].user.pk):
+            raise serializers.ValidationError("Token belongs to another user.")
+        return refresh
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh serializer that rejects revoked refresh tokens.
+
+    When refresh tokens are rotated with `BLACKLIST_AFTER_ROTATION`, the
+    rotated token is revoked.
+    """
+
+    def validate(self, attrs):
+        """
+        Issues a new access token unless the refresh token has been revoked.
+
+        Raises:
+            InvalidToken: If the refresh token has been revoked.
+        """
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh.get(api_settings.JTI_CLAIM, '')
+        if revocation_list.is_revoked(jti):
+            raise InvalidToken("Token has been revoked")
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            revocation_list.revoke(jti, refresh['exp'])
+        return super().validate(attrs)
+
+
 # for Friend requests
 
 from .models import FriendRequest
@@ -97,11 +215,26 @@ from .models import FriendRequest
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'email', 'first_name', 'last_name']
-        
+        fields = ['id', 'email', 'first_name', 'last_name', 'friend_count']
+        read_only_fields = ['friend_count']
+
+
+class UserProfileSerializer(UserSerializer):
+    """
+    Serializer for the authenticated user's own profile, which adds the number of pending requests received.
+    """
+    class Meta(UserSerializer.Meta):
+        fields = [*UserSerializer.Meta.fields, 'pending_incoming_count']
+        read_only_fields = [*UserSerializer.Meta.read_only_fields, 'pending_incoming_count']
+
+
 class FriendRequestListSerializer(serializers.ModelSerializer):
     """
     Serializer for listing friend requests.
+
+    Methods:
+        setup_eager_loading(queryset):
+            Joins both users into the queryset, loading only the serialized columns.
     """
     from_user = UserSerializer()
     to_user = UserSerializer()
@@ -110,6 +243,24 @@ class FriendRequestListSerializer(serializers.ModelSerializer):
         model = FriendRequest
         fields = ['id', 'from_user', 'to_user', 'status', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Fetches the related users in the same query instead of one query per row.
+
+        Args:
+            queryset (QuerySet): A `FriendRequest` queryset.
+
+        Returns:
+            QuerySet: The queryset joined to both users, restricted to the columns this serializer emits.
+        """
+        user_fields = UserSerializer.Meta.fields
+        return queryset.select_related('from_user', 'to_user').only(
+            'id', 'status', 'created_at',
+            *(f'from_user__{field}' for field in user_fields),
+            *(f'to_user__{field}' for field in user_fields),
+        )
+
 
 class FriendRequestSerializer(serializers.ModelSerializer):
     
@@ -145,6 +296,24 @@ class FriendRequestSerializer(serializers.ModelSerializer):
         return data
 
 
+class FriendRequestBulkSerializer(serializers.Serializer):
+    """
+    Serializer for sending friend requests to several users at once.
+
+    Only the shape of the batch is validated here; each target is checked by
+    the view with set-based queries so that results can be reported per item.
+    A batch may not be larger than the 'friend_request_bulk' rate limit, so
+    that any accepted batch can be sent.
+    """
+    to_users = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_to_users(self, value):
+        limit = get_rate_limit('friend_request_bulk')['limit']
+        if len(value) > limit:
+            raise serializers.ValidationError(f"Ensure this field has no more than {limit} elements.")
+        return value
+
+
 class FriendRequestActionSerializer(serializers.ModelSerializer):
     """
     Serializer for accepting or rejecting friend requests.
@@ -154,3 +323,175 @@ class FriendRequestActionSerializer(serializers.ModelSerializer):
     class Meta:
         model = FriendRequest
         fields = ['status']
+
+
+class FriendRequestBulkActionSerializer(FriendRequestActionSerializer):
+    """
+    Serializer for accepting or rejecting several friend requests at once.
+
+    The requests are selected either by a list of IDs or as all pending
+    requests created before a timestamp.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000, required=False)
+    before = serializers.DateTimeField(required=False)
+
+    class Meta(FriendRequestActionSerializer.Meta):
+        fields = ['status', 'ids', 'before']
+
+    def validate(self, data):
+        """
+        Ensures exactly one way of selecting requests is given.
+        """
+        if ('ids' in data) == ('before' in data):
+            raise serializers.ValidationError("Provide either 'ids' or 'before'.")
+        return data
+
+
+class ISODateTimeRepresentation:
+    """
+    Fast `to_representation` of a `DateTimeField` rendered in ISO 8601.
+
+    `DateTimeField` looks up the current timezone for every value, which
+    costs more than formatting the value. `bind` looks it up once for a whole
+    batch of rows. The output is the same: aware values are converted to the
+    timezone, formatted with `isoformat`, and UTC is written as 'Z'.
+
+    Args:
+        field (DateTimeField): The field, used as is for naive values.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def bind(self):
+        """
+        Returns a converter for values serialized under the currently active timezone.
+        """
+        field = self.field
+        field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if not isinstance(value, datetime) or not timezone.is_aware(value):
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+        return convert
+
+
+class ValuesSerializer:
+    """
+    Read-only counterpart of a `ModelSerializer` working on `.values()` rows.
+
+    The serializer's readable fields are compiled once into a list of
+    columns, including those of nested serializers of foreign keys, and each
+    row is turned directly into a dict with the same keys, order and values
+    as `serializer_class(instance).data`. DRF's per-field dispatch is skipped:
+    integer and string fields pass the column value through, ISO 8601
+    datetimes use `ISODateTimeRepresentation`, and other fields (choices)
+    only call their `to_representation`.
+
+    Only fields backed by model columns are supported, which covers
+    `UserSerializer`, `UserSignupSerializer` and `FriendRequestListSerializer`.
+
+    Args:
+        serializer_class (type): The `ModelSerializer` whose output is reproduced.
+
+    Raises:
+        ImproperlyConfigured: On first use, if a field is not backed by a column.
+    """
+    # Fields whose representation of a database value is the value itself
+    PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.EmailField)
+
+    _instances = {}
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        """
+        Returns the shared `ValuesSerializer` of a serializer class.
+        """
+        if serializer_class not in cls._instances:
+            cls._instances[serializer_class] = cls(serializer_class)
+        return cls._instances[serializer_class]
+
+    @cached_property
+    def _compiled(self):
+        columns = []
+        return self._compile(self.serializer_class(), '', columns), columns
+
+    def _compile(self, serializer, prefix, columns):
+        plan = []
+        for field in serializer._readable_fields:
+            if field.source == '*' or isinstance(field, (serializers.ListSerializer, serializers.SerializerMethodField)):
+                raise ImproperlyConfigured(f'{type(serializer).__name__}.{field.field_name} is not backed by a column.')
+            column = prefix + '__'.join(field.source_attrs)
+            columns.append(column)
+            if isinstance(field, serializers.BaseSerializer):
+                # The foreign key column tells a missing related object apart
+                plan.append((field.field_name, column, None, self._compile(field, f'{column}__', columns)))
+            else:
+                plan.append((field.field_name, column, self._converter(field), None))
+        return plan
+
+    def _converter(self, field):
+        if type(field) in self.PASSTHROUGH_FIELDS:
+            return None
+        if (
+            isinstance(field, serializers.DateTimeField) and not hasattr(field, 'timezone')
+            and getattr(field, 'format', drf_settings.DATETIME_FORMAT) == ISO_8601
+        ):
+            return ISODateTimeRepresentation(field)
+        return field.to_representation
+
+    def _bind(self, plan):
+        # Converters that depend on the active timezone are resolved once per batch
+        return [
+            (key, column, convert.bind() if isinstance(convert, ISODateTimeRepresentation) else convert,
+             nested and self._bind(nested))
+            for key, column, convert, nested in plan
+        ]
+
+    @property
+    def columns(self):
+        """
+        The lookups to pass to `.values()`.
+        """
+        return self._compiled[1]
+
+    def values(self, queryset):
+        """
+        Returns the queryset's rows as dicts holding only the serialized columns.
+        """
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row, plan=None):
+        """
+        Returns the representation of one `.values()` row.
+        """
+        data = {}
+        for key, column, convert, nested in self._bind(self._compiled[0]) if plan is None else plan:
+            value = row[column]
+            if value is None:
+                data[key] = None
+            elif nested is not None:
+                data[key] = self.to_representation(row, nested)
+            elif convert is None:
+                data[key] = value
+            else:
+                data[key] = convert(value)
+        return data
+
+    def serialize(self, rows):
+        """
+        Returns the representations of `.values()` rows, as `serializer_class(instances, many=True).data` would.
+        """
+        rows = list(rows)  # Runs the query of a queryset first, so that it is not timed as serialization
+        with timed('serialize'):
+            plan = self._bind(self._compiled[0])
+            return [self.to_representation(row, plan) for row in rows]
+
@@ -0,0 +1,90 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .caching import friend_list_cache
+from .instrumentation import query_recorder
+from .profiling import slow_query_recorder
+from .models import FriendRequest, Friendship
+from .recommendations import friend_graph
+from .search import SEARCH_FIELDS, index_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def update_user_search_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Reindexes a user for search whenever one of its searchable fields may have changed.
+
+    Search tokens are removed together with the user by cascade, so no delete
+    handler is needed.
+    """
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    index_user(instance)
+
+
+@receiver(pre_delete, sender=User)
+def update_friends_of_deleted_user(sender, instance, **kwargs):
+    """
+    Updates the counters and cached friend lists of the users related to a deleted user.
+
+    Every friend loses a friend and every receiver of a pending request from
+    the user loses a pending request. Runs before the delete, inside its
+    transaction, while the user's friendships and requests still exist. The
+    caches are updated once the delete is committed, so that a concurrent
+    request cannot cache the lists again from the rows being deleted.
+    """
+    friend_ids = list(Friendship.objects.filter(user=instance).values_list('friend_id', flat=True))
+    User.adjust_counts('friend_count', {friend_id: -1 for friend_id in friend_ids})
+    receivers = FriendRequest.objects.filter(from_user=instance, status='pending').values_list('to_user_id', flat=True)
+    User.adjust_counts('pending_incoming_count', {user_id: -count for user_id, count in Counter(receivers).items()})
+    user_id = instance.pk
+    transaction.on_commit(lambda: friend_list_cache.invalidate(user_id, *friend_ids))
+    transaction.on_commit(lambda: friend_graph.remove_users([user_id]))
+
+
+@receiver(post_delete, sender=FriendRequest)
+def update_receiver_of_deleted_request(sender, instance, origin=None, **kwargs):
+    """
+    Decrements the pending request count of the receiver of a deleted pending request.
+
+    Requests deleted along with their sender are already counted by
+    `update_friends_of_deleted_user`, and those deleted along with their
+    receiver need no update.
+    """
+    if instance.status != 'pending' or isinstance(origin, User):
+        return
+    User.adjust_counts('pending_incoming_count', {instance.to_user_id: -1})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drops the cached authentication profile of a saved or deleted user, e.g. on deactivation.
+
+    The profile is dropped again on commit, in case a concurrent request
+    cached the old row before the change was visible.
+    """
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(connection_created)
+def install_query_recorders(sender, connection, **kwargs):
+    """
+    Installs the instrumentation and slow query execute wrappers on a newly opened connection.
+
+    The wrappers are put first, so that temporary wrappers added and removed
+    around them (such as the replica latency recorder) do not remove them.
+    """
+    for wrapper in (slow_query_recorder, query_recorder):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, wrapper)
@@ -1,3 +1,1097 @@
-from django.test import TestCase
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.apps import apps
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache_backends import AtomicFileBasedCache
+from .db.pool import ConnectionPool, PoolTimeout
+from .caching import friend_list_cache
+from .db.routers import ReplicaRouter, ReplicaSelector, is_pinned_to_primary, pin_to_primary, replica_reads
+from .instrumentation import registry
+from .parsers import FastJSONParser
+from .profiling import slow_query_log
+from .ratelimit import SlidingWindowRateLimiter
+from .models import CustomUser, FriendRequest, Friendship, UserSearchToken
+from .recommendations import FriendGraph, friend_graph
+from .renderers import FastJSONRenderer, JSONFragment, orjson
+from .serializers import FriendRequestListSerializer, UserSerializer, UserSignupSerializer, ValuesSerializer
+from .revocation import BloomFilter, RevocationList
+from .search import ngrams, search_users
+
+
+@override_settings(FRIEND_LIST_CACHE='')
+class QueryCountTestCase(TestCase):
+    """
+    Base test case for asserting that endpoints use a constant number of queries.
+
+    Response caches are disabled so that every request reaches the database.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('owner@example.com', first_name='Owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.created = 0
+
+    def create_users(self, count):
+        users = [
+            CustomUser.objects.create_user(f'member{self.created + i}@example.com', first_name='Member')
+            for i in range(count)
+        ]
+        self.created += count
+        return users
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def assertConstantQueries(self, add_rows, url, params=None):
+        """
+        Asserts that the number of queries for `url` does not grow with the number of rows.
+
+        Args:
+            add_rows (callable): Adds `count` rows to the listed data when called with a count.
+            url (str): The endpoint to request.
+            params (dict, optional): Query parameters of the request.
+        """
+        add_rows(2)
+        baseline = self.count_queries(url, params)
+        add_rows(5)
+        self.assertEqual(self.count_queries(url, params), baseline, 'Queries grow with the number of rows')
+
+
+class EndpointQueryCountTests(QueryCountTestCase):
+
+    def test_user_search(self):
+        self.assertConstantQueries(self.create_users, reverse('user-search'), {'keyword': 'member'})
+
+    def test_user_search_cursor_pagination(self):
+        self.assertConstantQueries(
+            self.create_users, reverse('user-search'), {'keyword': 'member', 'pagination': 'cursor'}
+        )
+
+    def test_friend_list(self):
+        def add_friends(count):
+            for friend in self.create_users(count):
+                Friendship.create_pair(self.user.id, friend.id)
+
+        self.assertConstantQueries(add_friends, reverse('friend-request-list'), {'status': 'accepted'})
+
+    def test_pending_friend_requests(self):
+        def add_pending_requests(count):
+            for sender in self.create_users(count):
+                FriendRequest.objects.create(from_user=sender, to_user=self.user)
+
+        self.assertConstantQueries(add_pending_requests, reverse('friend-request-list'), {'status': 'pending'})
+
+
+class FriendListCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user, self.friend, self.sender = (
+            CustomUser.objects.create_user(f'{name}@example.com') for name in ('owner', 'friend', 'sender')
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Friendship.create_pair(self.user.id, self.friend.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('friend-request-list')
+
+    def get_friend_ids(self):
+        response = self.client.get(self.url, {'status': 'accepted'})
+        return [friend['id'] for friend in response.json()['results']]
+
+    def test_second_request_is_served_from_cache(self):
+        hits = friend_list_cache.hits
+        self.assertEqual(self.get_friend_ids(), [self.friend.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_friend_ids(), [self.friend.id])
+        self.assertEqual(friend_list_cache.hits, hits + 1)
+
+    def test_accepting_request_invalidates_cache(self):
+        self.get_friend_ids()
+        friend_request = FriendRequest.objects.create(from_user=self.sender, to_user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('friend-request-action', args=[friend_request.id]), {'status': 'accepted'})
+        self.assertEqual(self.get_friend_ids(), [self.friend.id, self.sender.id])
+
+    def test_invalidation_during_query_is_not_overwritten(self):
+        request = APIClient().get(self.url).wsgi_request
+        request.user = self.user
+        content, key = friend_list_cache.get(request)
+        self.assertIsNone(content)
+        friend_list_cache.invalidate(self.user.id)
+        friend_list_cache.set(key, b'{"stale":true}')
+        self.assertIsNone(friend_list_cache.get(request)[0])
+
+    def test_deleting_friend_invalidates_cache(self):
+        self.get_friend_ids()
+        version = friend_list_cache.get_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.friend.delete()
+            # Invalidated only once the delete is committed
+            self.assertEqual(friend_list_cache.get_version(self.user.id), version)
+        self.assertNotEqual(friend_list_cache.get_version(self.user.id), version)
+        self.assertEqual(self.client.get(self.url, {'status': 'accepted'}).status_code, 404)
+
+
+class FriendRequestActionTests(TestCase):
+
+    def setUp(self):
+        self.sender, self.receiver, self.other = (
+            CustomUser.objects.create_user(f'{name}@example.com') for name in ('sender', 'receiver', 'other')
+        )
+        self.friend_request = FriendRequest.objects.create(from_user=self.sender, to_user=self.receiver)
+        self.url = reverse('friend-request-action', args=[self.friend_request.id])
+
+    def patch_as(self, user, data):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.patch(self.url, data)
+
+    def test_accept_creates_friendship(self):
+        response = self.patch_as(self.receiver, {'status': 'accepted'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Friendship.objects.filter(user=self.sender, friend=self.receiver).exists())
+        self.assertTrue(Friendship.objects.filter(user=self.receiver, friend=self.sender).exists())
+
+    def test_only_receiver_can_act(self):
+        self.assertEqual(self.patch_as(self.other, {'status': 'accepted'}).status_code, 403)
+        self.assertEqual(self.patch_as(self.sender, {'status': 'accepted'}).status_code, 403)
+
+    def test_cannot_act_twice(self):
+        self.assertEqual(self.patch_as(self.receiver, {'status': 'rejected'}).status_code, 200)
+        self.assertEqual(self.patch_as(self.receiver, {'status': 'accepted'}).status_code, 404)
+        self.assertFalse(Friendship.objects.exists())
+
+    def test_invalid_status(self):
+        self.assertEqual(self.patch_as(self.receiver, {'status': 'pending'}).status_code, 400)
+
+
+class FriendRequestBulkActionTests(TestCase):
+
+    def setUp(self):
+        self.receiver = CustomUser.objects.create_user('receiver@example.com')
+        self.senders = [CustomUser.objects.create_user(f'sender{i}@example.com') for i in range(3)]
+        self.requests = [FriendRequest.objects.create(from_user=sender, to_user=self.receiver) for sender in self.senders]
+        self.client = APIClient()
+        self.client.force_authenticate(self.receiver)
+        self.url = reverse('friend-request-action-bulk')
+
+    def test_accepts_listed_requests_and_reports_failures(self):
+        foreign = FriendRequest.objects.create(from_user=self.receiver, to_user=self.senders[0])
+        ids = [self.requests[0].id, self.requests[1].id, foreign.id, 10 ** 9]
+        response = self.client.patch(self.url, {'status': 'accepted', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual([failure['id'] for failure in response.json()['failed']], [foreign.id, 10 ** 9])
+        self.assertEqual(Friendship.objects.filter(user=self.receiver).count(), 2)
+        self.assertEqual(FriendRequest.objects.get(id=self.requests[2].id).status, 'pending')
+
+    def test_rejects_all_pending_before_timestamp(self):
+        before = timezone.now()
+        late = FriendRequest.objects.create(from_user=CustomUser.objects.create_user('late@example.com'), to_user=self.receiver)
+        response = self.client.patch(self.url, {'status': 'rejected', 'before': before.isoformat()}, format='json')
+        self.assertEqual(response.json()['updated'], 3)
+        self.assertEqual(FriendRequest.objects.get(id=late.id).status, 'pending')
+        self.assertFalse(Friendship.objects.exists())
+
+    def test_requires_ids_or_before(self):
+        self.assertEqual(self.client.patch(self.url, {'status': 'accepted'}, format='json').status_code, 400)
+
+
+class FriendRequestActionConcurrencyTests(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Checked here rather than at import, when the connection still points at the settings' database
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            cls.use_file_database()
+
+    @classmethod
+    def use_file_database(cls):
+        """
+        Points the default connection at a temporary SQLite file until the end of the class.
+
+        Shared in-memory SQLite databases report lock conflicts between threads
+        as errors instead of waiting for the lock, as a file database does.
+        """
+        directory = tempfile.TemporaryDirectory()
+        in_memory_name, in_memory_connection = connection.settings_dict['NAME'], connection.connection
+        # Closing the in-memory connection would destroy the database, so it is set aside instead
+        connection.connection = None
+        connection.settings_dict['NAME'] = f'{directory.name}/test.sqlite3'
+
+        def restore():
+            connection.close()
+            connection.settings_dict['NAME'] = in_memory_name
+            connection.connection = in_memory_connection
+            directory.cleanup()
+
+        cls.addClassCleanup(restore)
+        call_command('migrate', verbosity=0, interactive=False)
+
+    def test_parallel_actions_have_exactly_one_winner(self):
+        sender = CustomUser.objects.create_user('sender@example.com')
+        receiver = CustomUser.objects.create_user('receiver@example.com')
+        friend_request = FriendRequest.objects.create(from_user=sender, to_user=receiver)
+        url = reverse('friend-request-action', args=[friend_request.id])
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def act(action_status):
+            client = APIClient()
+            client.force_authenticate(receiver)
+            barrier.wait()
+            try:
+                return client.patch(url, {'status': action_status}).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            codes = list(executor.map(act, ['accepted', 'rejected'] * (workers // 2)))
+
+        self.assertEqual(codes.count(200), 1, codes)
+        self.assertEqual(codes.count(404), workers - 1, codes)
+        friend_request.refresh_from_db()
+        expected_edges = 2 if friend_request.status == 'accepted' else 0
+        self.assertEqual(Friendship.objects.count(), expected_edges)
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowRateLimiter('test', limit=3, window=60, cache=cache)
+
+    def hit_at(self, now, cost=1):
+        with patch('SocialCore.ratelimit.time.time', return_value=now):
+            return self.limiter.hit('user', cost=cost)
+
+    def test_cost_counts_every_hit_of_a_batch(self):
+        self.assertTrue(self.hit_at(6000, cost=3))
+        self.assertFalse(self.hit_at(6001))
+
+    def test_rejected_hits_are_rolled_back(self):
+        self.assertTrue(self.hit_at(6000, cost=2))
+        self.assertFalse(self.hit_at(6001, cost=2))
+        self.assertTrue(self.hit_at(6002))
+        self.assertFalse(self.hit_at(6003))
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        self.assertTrue(self.hit_at(6000, cost=3))
+        # Half of the previous window is still covered: 1.5 hits of it count
+        self.assertTrue(self.hit_at(6090))
+        self.assertFalse(self.hit_at(6090))
+        # Nine tenths in: 0.3 hits of it count
+        self.assertTrue(self.hit_at(6114))
+        self.assertFalse(self.hit_at(6114))
+
+    def test_window_rollover_resets_the_count(self):
+        self.assertTrue(self.hit_at(6000, cost=3))
+        self.assertFalse(self.hit_at(6059))
+        self.assertTrue(self.hit_at(6120, cost=3))
+
+
+class FriendRequestBulkCreateTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()  # Rate limit counters
+        self.user = CustomUser.objects.create_user('sender@example.com')
+        self.targets = [CustomUser.objects.create_user(f'target{i}@example.com') for i in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('friend-request-send-bulk')
+
+    def test_reports_result_per_user(self):
+        FriendRequest.objects.create(from_user=self.user, to_user=self.targets[0])
+        to_users = [self.targets[0].id, self.user.id, 10 ** 9, self.targets[1].id]
+        # Lookups, insert and counter update, plus the savepoint pair of the insert's transaction
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, {'to_users': to_users}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sent'], 1)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['failed', 'failed', 'failed', 'sent'])
+        self.assertTrue(FriendRequest.objects.filter(from_user=self.user, to_user=self.targets[1]).exists())
+
+    def test_sends_batch_larger_than_single_request_limit(self):
+        response = self.client.post(self.url, {'to_users': [target.id for target in self.targets]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['sent'], 4)
+
+    @override_settings(RATE_LIMITS={'friend_request': {'limit': 3, 'window': 60}, 'friend_request_bulk': {'limit': 4, 'window': 60}})
+    def test_rate_limit_applies_to_whole_batch(self):
+        self.client.post(self.url, {'to_users': [target.id for target in self.targets[:2]]}, format='json')
+        response = self.client.post(self.url, {'to_users': [target.id for target in self.targets[2:]] + [self.user.id]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.post(self.url, {'to_users': [CustomUser.objects.create_user('late@example.com').id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(FriendRequest.objects.count(), 4)
+
+    def test_batches_do_not_count_against_single_requests(self):
+        late = [CustomUser.objects.create_user(f'late{i}@example.com') for i in range(2)]
+        for rate_limit_cache, target in zip(['', 'shared'], late):
+            with self.subTest(rate_limit_cache=rate_limit_cache), override_settings(RATE_LIMIT_CACHE=rate_limit_cache):
+                FriendRequest.objects.all().delete()
+                response = self.client.post(self.url, {'to_users': [target.id for target in self.targets]}, format='json')
+                self.assertEqual(response.status_code, 200, response.content)
+                response = self.client.post(reverse('friend-request-send'), {'to_user': target.id}, format='json')
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual(FriendRequest.objects.get(to_user=target).action, 'friend_request')
+
+    @override_settings(RATE_LIMITS={'friend_request': {'limit': 3, 'window': 60}, 'friend_request_bulk': {'limit': 2, 'window': 60}})
+    def test_rejects_batch_larger_than_limit(self):
+        response = self.client.post(self.url, {'to_users': [target.id for target in self.targets[:3]]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('to_users', response.json())
+
+
+@override_settings(FRIEND_LIST_CACHE='')
+class AsyncViewParityTests(TestCase):
+    """
+    The async views return the same responses as their sync counterparts.
+    """
+
+    def setUp(self):
+        caches['shared'].clear()  # Rate limit counters
+        self.user = CustomUser.objects.create_user('owner@example.com', first_name='Owner')
+        self.friends = [CustomUser.objects.create_user(f'member{i}@example.com', first_name='Member') for i in range(3)]
+        for friend in self.friends:
+            Friendship.create_pair(self.user.id, friend.id)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def assertSameResponse(self, name, params):
+        sync_response = self.client.get(reverse(name), params)
+        async_response = self.client.get(reverse(f'async-{name}'), params)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.content.replace(b'/async/', b'/'), sync_response.content)
+
+    def test_user_search(self):
+        self.assertSameResponse('user-search', {'keyword': 'member', 'page_size': 2, 'page': 2})
+        self.assertSameResponse('user-search', {'keyword': 'member', 'page': 5})
+
+    def test_friend_list(self):
+        self.assertSameResponse('friend-request-list', {'status': 'accepted', 'page_size': 2})
+        self.assertSameResponse('friend-request-list', {'status': 'pending'})
+
+    def test_send_and_accept(self):
+        response = self.client.post(reverse('async-friend-request-send'), {'to_user': self.friends[0].id}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        incoming = FriendRequest.objects.create(from_user=self.friends[1], to_user=self.user)
+        url = reverse('async-friend-request-action', args=[incoming.id])
+        self.assertEqual(self.client.patch(url, {'status': 'accepted'}, format='json').status_code, 200)
+        self.assertEqual(self.client.patch(url, {'status': 'accepted'}, format='json').status_code, 404)
+
+    def test_login_under_csrf_checks(self):
+        self.user.set_password('secret-password')
+        self.user.save()
+        client = APIClient(enforce_csrf_checks=True)
+        credentials = {'email': 'owner@example.com', 'password': 'secret-password'}
+        sync_response = client.post(reverse('user-login'), credentials, format='json')
+        async_response = client.post(reverse('async-user-login'), credentials, format='json')
+        self.assertEqual(sync_response.status_code, 200, sync_response.content)
+        self.assertEqual(async_response.status_code, 200, async_response.content)
+        self.assertIn('access', async_response.json())
+
+    def test_writes_under_csrf_checks(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        response = client.post(reverse('async-friend-request-send'), {'to_user': self.friends[0].id}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        incoming = FriendRequest.objects.create(from_user=self.friends[1], to_user=self.user)
+        response = client.patch(reverse('async-friend-request-action', args=[incoming.id]), {'status': 'accepted'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.get(reverse('async-user-search'), {'keyword': 'member'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+
+class NormalizedEmailTests(TestCase):
+
+    def setUp(self):
+        CustomUser.objects.create_user('Owner@Example.com', password='secret-password')
+        self.client = APIClient()
+
+    def test_signup_rejects_email_in_other_case(self):
+        response = self.client.post(reverse('user-signup'), {'email': 'OWNER@example.com', 'password': 'x8!kQz#pLm'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'email': ['custom user with this email already exists.']})
+
+    def test_login_looks_up_normalized_email(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('user-login'), {'email': ' owner@EXAMPLE.com', 'password': 'secret-password'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn('"normalized_email" = ', queries[0]['sql'])
+
+
+class UserSearchTests(TestCase):
+
+    def setUp(self):
+        self.jane = CustomUser.objects.create_user('Jane@Example.com', first_name='Jane')
+        self.other = CustomUser.objects.create_user('jane@example.com.au', first_name='Other')
+
+    def search(self, keyword):
+        return list(search_users(keyword).values_list('id', flat=True))
+
+    def test_partial_email_matches_substring(self):
+        self.assertEqual(self.search('jane@example.co'), [self.jane.id, self.other.id])
+
+    def test_exact_email_ranked_first(self):
+        self.jane.delete()
+        jane = CustomUser.objects.create_user('Jane@Example.com', first_name='Jane')
+        self.assertLess(self.other.id, jane.id)
+        self.assertEqual(self.search('JANE@example.com'), [jane.id, self.other.id])
+
+    def test_exact_email_is_looked_up_on_its_own(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('jane@example.com')
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"normalized_email" = ', queries[0]['sql'])
+        self.assertNotIn('"normalized_email"', queries[1]['sql'])
+
+    def tokens(self, user):
+        return set(UserSearchToken.objects.filter(user=user).values_list('token', flat=True))
+
+    def test_tokens_are_trigrams_of_searchable_fields(self):
+        self.assertEqual(ngrams('Jane'), {'jan', 'ane'})
+        self.assertEqual(ngrams('Al'), set())
+        self.assertEqual(self.tokens(self.jane), ngrams('jane@example.com') | {'jan', 'ane'})
+        self.jane.last_name = 'Doe'
+        self.jane.save(update_fields=['last_name'])
+        self.assertIn('doe', self.tokens(self.jane))
+
+    def test_short_keywords_scan_for_substrings(self):
+        CustomUser.objects.create_user('bo@example.org', first_name='Bo')
+        self.assertEqual(len(self.search('bo')), 1)
+        self.assertEqual(self.search('ja'), [self.jane.id, self.other.id])
+
+    def test_reindex_after_update(self):
+        CustomUser.objects.filter(pk=self.other.pk).update(last_name='Quixote')
+        self.assertEqual(self.search('quixote'), [])
+        call_command('reindex_user_search', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.search('quixote'), [self.other.id])
+
+    def test_migration_backfills_tokens(self):
+        migration = import_module('SocialCore.migrations.0005_usersearchtoken')
+        expected = {user.id: self.tokens(user) for user in (self.jane, self.other)}
+        UserSearchToken.objects.all().delete()
+        migration.backfill_search_tokens(apps, None)
+        self.assertEqual({user.id: self.tokens(user) for user in (self.jane, self.other)}, expected)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('owner@example.com')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('user-search')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url, {'keyword': 'owner'}).status_code, 200)
+        return [query for query in queries if 'FROM "SocialCore_customuser" WHERE "SocialCore_customuser"."id" =' in query['sql']]
+
+    def test_profile_is_cached(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_deactivation_invalidates_profile(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url, {'keyword': 'owner'}).status_code, 401)
+
+
+class AtomicFileBasedCacheTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = directory.name
+
+    def run_threads(self, target, count=8):
+        # One cache instance per thread, as each worker process would have its own
+        with ThreadPoolExecutor(count) as executor:
+            return list(executor.map(lambda _: target(AtomicFileBasedCache(self.location, {})), range(count)))
+
+    def test_concurrent_increments_are_not_lost(self):
+        AtomicFileBasedCache(self.location, {}).add('counter', 0, timeout=None)
+        results = self.run_threads(lambda cache: [cache.incr('counter') for _ in range(25)])
+        self.assertEqual(sorted(sum(results, [])), list(range(1, 201)))
+
+    def test_only_one_concurrent_add_succeeds(self):
+        results = self.run_threads(lambda cache: cache.add('key', 'value'))
+        self.assertEqual(results.count(True), 1)
+
+    def test_incr_keeps_expiry(self):
+        cache = AtomicFileBasedCache(self.location, {})
+        cache.set('counter', 1, timeout=None)
+        cache.incr('counter')
+        with patch('django.core.cache.backends.filebased.time.time', return_value=time.time() + 3600):
+            self.assertEqual(cache.get('counter'), 2)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+
+class TokenRevocationTests(TestCase):
+
+    def setUp(self):
+        CustomUser.objects.create_user('owner@example.com', password='secret-password')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(reverse('user-login'), {'email': 'owner@example.com', 'password': 'secret-password'}, format='json')
+        return response.json()
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        tokens, other = self.login(), self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.post(reverse('user-logout'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(self.client.get(reverse('user-search'), {'keyword': 'owner'}).status_code, 401)
+        self.client.credentials()
+        self.assertEqual(self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']}, format='json').status_code, 401)
+        response = self.client.post(reverse('token-refresh'), {'refresh': other['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(self.client.get(reverse('user-search'), {'keyword': 'owner'}).status_code, 200)
+
+    def test_revocations_sync_between_workers(self):
+        caches['shared'].clear()
+        exp = timezone.now().timestamp() + 60
+        first, second = RevocationList(capacity=100, generation=3600), RevocationList(capacity=100, generation=3600)
+        with self.assertNoLogs('SocialCore.revocation', 'WARNING'):
+            first.revoke('revoked-jti', exp)
+        self.assertTrue(first.is_revoked('revoked-jti'))
+        second.sync(force=True)
+        self.assertTrue(second.is_revoked('revoked-jti'))
+        self.assertFalse(second.is_revoked('other-jti'))
+
+    def test_colliding_sequence_number_is_not_overwritten(self):
+        caches['shared'].clear()
+        exp = timezone.now().timestamp() + 60
+        first, second = RevocationList(capacity=100, generation=3600), RevocationList(capacity=100, generation=3600)
+        first.revoke('first-jti', exp)
+        caches['shared'].set('token-revocation:seq', 0, timeout=None)  # Another worker drew the same number
+        second.revoke('second-jti', exp)
+        third = RevocationList(capacity=100, generation=3600)
+        third.sync(force=True)
+        self.assertTrue(third.is_revoked('first-jti'))
+        self.assertTrue(third.is_revoked('second-jti'))
+
+    @override_settings(TOKEN_REVOCATION_CACHE='default')
+    def test_local_memory_cache_is_logged(self):
+        cache.clear()
+        with self.assertLogs('SocialCore.revocation', 'WARNING'):
+            RevocationList(capacity=100, generation=3600).revoke('revoked-jti', timezone.now().timestamp() + 60)
+
+    def test_expired_generations_are_dropped(self):
+        revocations = RevocationList(capacity=100, generation=60)
+        start = (timezone.now().timestamp() // 60 + 1) * 60  # The start of the next generation
+        revocations._add('expiring-jti', start + 1)
+        revocations._add('live-jti', start + 90)
+        self.assertTrue(revocations.is_revoked('expiring-jti'))
+        with patch('SocialCore.revocation.time.time', return_value=start + 60):
+            revocations.sync(force=True)
+            self.assertFalse(revocations.is_revoked('expiring-jti'))
+            self.assertEqual(revocations.stats()['generations'], 1)
+            self.assertTrue(revocations.is_revoked('live-jti'))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        keys = [f'jti-{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertLess(sum(f'other-{i}' in bloom for i in range(1000)), 50)
+
+
+class PasswordRehashTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('owner@example.com')
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            self.user.set_password('old-password')
+        self.user.save()
+
+    def login(self, name):
+        return APIClient().post(reverse(name), {'email': 'OWNER@example.com', 'password': 'old-password'}, format='json')
+
+    @override_settings(PASSWORD_HASHERS=['SocialCore.hashers.TunedScryptPasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_login_rehashes_with_preferred_hasher(self):
+        for name in ('user-login', 'async-user-login'):
+            CustomUser.objects.filter(pk=self.user.pk).update(password=self.user.password)
+            response = self.login(name)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(set(response.json()), {'refresh', 'access'})
+            self.assertTrue(CustomUser.objects.get(pk=self.user.pk).password.startswith('scrypt$'))
+
+    def test_wrong_password_is_rejected(self):
+        for name in ('user-login', 'async-user-login'):
+            response = APIClient().post(reverse(name), {'email': 'owner@example.com', 'password': 'wrong'}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'non_field_errors': ['Invalid email or password']})
+
+
+class FriendSuggestionTests(TestCase):
+
+    def setUp(self):
+        friend_graph.clear()
+        self.user, self.alice, self.bob, self.carol, self.dave = [
+            CustomUser.objects.create_user(f'{name}@example.com') for name in ('owner', 'alice', 'bob', 'carol', 'dave')
+        ]
+        Friendship.create_pairs([
+            (self.user.id, self.alice.id), (self.user.id, self.bob.id),
+            (self.alice.id, self.carol.id), (self.bob.id, self.carol.id), (self.alice.id, self.dave.id),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        friend_graph.clear()
+
+    def suggestions(self):
+        response = self.client.get(reverse('friend-suggestions'))
+        self.assertEqual(response.status_code, 200)
+        return [(result['id'], result['mutual_friends']) for result in response.json()['results']]
+
+    def test_ranks_friends_of_friends_by_mutual_friends(self):
+        self.assertEqual(self.suggestions(), [(self.carol.id, 2), (self.dave.id, 1)])
+        self.assertEqual(friend_graph.get().mutual_friends(self.user.id, self.carol.id), [self.alice.id, self.bob.id])
+
+    def test_excludes_pending_requests_and_new_friends(self):
+        FriendRequest.objects.create(from_user=self.dave, to_user=self.user)
+        self.assertEqual(self.suggestions(), [(self.carol.id, 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Friendship.create_pair(self.user.id, self.carol.id)
+        self.assertEqual(self.suggestions(), [])
+
+    def test_deleted_users_are_not_suggested_or_counted(self):
+        friend_graph.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.delete()
+        self.assertEqual(self.suggestions(), [(self.carol.id, 1)])
+        self.assertEqual(friend_graph.get().mutual_friends(self.user.id, self.carol.id), [self.bob.id])
+
+    def test_stale_graph_is_served_while_rebuilt_in_background(self):
+        stale = friend_graph.get()
+        stale.built_at -= 3600
+        rebuilt = FriendGraph.from_edges([], [], max_id=0)
+        loading = threading.Event()
+
+        def load():
+            loading.wait(5)
+            return rebuilt
+
+        with patch.object(FriendGraph, 'load', side_effect=load):
+            self.assertIs(friend_graph.get(), stale)
+            # Friendships added during the load are carried over to the new graph
+            friend_graph.add_friendships([(self.carol.id, self.dave.id)])
+            self.assertIs(friend_graph.get(), stale)
+            loading.set()
+            friend_graph._rebuild_thread.join(5)
+        self.assertIs(friend_graph.get(), rebuilt)
+        self.assertEqual(list(rebuilt.friends(self.carol.id)), [self.dave.id])
+
+    def test_graph_from_unsorted_edges(self):
+        graph = FriendGraph.from_edges([3, 1, 2, 1], [1, 3, 1, 2], max_id=3)
+        self.assertEqual(list(graph.friends(1)), [2, 3])
+        self.assertEqual(graph.suggest(2), [(3, 1)])
+
+
+class FriendCountTests(TestCase):
+
+    def setUp(self):
+        caches['shared'].clear()  # Rate limit counters
+        self.receiver = CustomUser.objects.create_user('receiver@example.com')
+        self.senders = [CustomUser.objects.create_user(f'sender{i}@example.com') for i in range(3)]
+        self.client = APIClient()
+
+    def counts(self, user):
+        user = CustomUser.objects.get(pk=user.pk)
+        return user.friend_count, user.pending_incoming_count
+
+    def test_counts_follow_requests_actions_and_deletion(self):
+        self.client.force_authenticate(self.senders[0])
+        self.client.post(reverse('friend-request-send'), {'to_user': self.receiver.id}, format='json')
+        for sender in self.senders[1:]:
+            FriendRequest.send_many(sender, [self.receiver.id])
+        self.assertEqual(self.counts(self.receiver), (0, 3))
+
+        self.client.force_authenticate(self.receiver)
+        first = FriendRequest.objects.get(from_user=self.senders[0])
+        self.client.patch(reverse('friend-request-action', args=[first.id]), {'status': 'accepted'}, format='json')
+        self.client.patch(reverse('friend-request-action-bulk'), {'status': 'accepted', 'before': timezone.now().isoformat()}, format='json')
+        self.assertEqual(self.counts(self.receiver), (3, 0))
+        self.assertEqual(self.counts(self.senders[0]), (1, 0))
+
+        # Accepting an existing friendship again does not count it twice
+        Friendship.create_pair(self.senders[0].id, self.receiver.id)
+        self.assertEqual(self.counts(self.receiver), (3, 0))
+
+        FriendRequest.objects.create(from_user=self.senders[1], to_user=self.senders[2])
+        self.senders[1].delete()
+        self.assertEqual(self.counts(self.receiver), (2, 0))
+        self.assertEqual(self.counts(self.senders[2]), (1, 0))
+
+        response = self.client.get(reverse('friend-request-list'), {'status': 'accepted'})
+        self.assertEqual(response.json()['results'][0]['friend_count'], 1)
+        self.assertNotIn('pending_incoming_count', response.json()['results'][0])
+
+    def test_deleting_pending_request_decrements_count(self):
+        pending = FriendRequest.objects.create(from_user=self.senders[0], to_user=self.receiver)
+        FriendRequest.objects.create(from_user=self.senders[1], to_user=self.receiver)
+        rejected = FriendRequest.objects.create(from_user=self.senders[2], to_user=self.receiver)
+        FriendRequest.respond(rejected.id, self.receiver, 'rejected')
+        pending.delete()
+        FriendRequest.objects.filter(pk=rejected.pk).delete()
+        self.assertEqual(self.counts(self.receiver), (0, 1))
+
+    def test_profile_has_own_counts(self):
+        FriendRequest.objects.create(from_user=self.senders[0], to_user=self.receiver)
+        Friendship.create_pair(self.senders[1].id, self.receiver.id)
+        self.client.force_authenticate(self.receiver)
+        response = self.client.get(reverse('user-profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['friend_count'], response.json()['pending_incoming_count']), (1, 1))
+
+    def test_saving_stale_instance_keeps_counts(self):
+        stale = CustomUser.objects.get(pk=self.receiver.pk)
+        FriendRequest.objects.create(from_user=self.senders[0], to_user=self.receiver)
+        stale.first_name = 'Receiver'
+        stale.save()
+        self.assertEqual(self.counts(self.receiver), (0, 1))
+
+    def test_repair_command_fixes_drift(self):
+        FriendRequest.objects.create(from_user=self.senders[0], to_user=self.receiver)
+        Friendship.create_pair(self.senders[1].id, self.receiver.id)
+        CustomUser.objects.update(friend_count=7, pending_incoming_count=7)
+        out = StringIO()
+        call_command('repair_friend_counts', batch_size=2, stdout=out)
+        self.assertEqual(self.counts(self.receiver), (1, 1))
+        self.assertEqual(self.counts(self.senders[2]), (0, 0))
+        self.assertIn('Repaired 4 of 4 users', out.getvalue())
+
+
+class ConnectionPoolTests(TestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(
+            connect=lambda: sqlite3.connect(':memory:', check_same_thread=False),
+            size=1, max_overflow=1, timeout=0.05,
+        )
+
+    def test_reuses_released_connection(self):
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+        self.assertIs(self.pool.acquire(), connection)
+        self.assertEqual(self.pool.stats()['opened'], 1)
+
+    def test_closes_overflow_connections_on_release(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.pool.release(first)
+        self.pool.release(second)
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+    def test_times_out_when_saturated(self):
+        self.pool.acquire()
+        self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        stats = self.pool.stats()
+        self.assertEqual((stats['checked_out'], stats['timeouts'], stats['saturation']), (2, 1, 1.0))
+
+    def test_replaces_unusable_connection(self):
+        self.pool._is_usable = lambda connection: False
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+        self.assertIsNot(self.pool.acquire(), connection)
+        self.assertEqual(self.pool.stats()['opened'], 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'])
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        cache.clear()
+
+    def test_reads_use_primary_outside_replica_block(self):
+        self.assertIsNone(self.router.db_for_read(CustomUser))
+
+    def test_round_robin_over_replicas(self):
+        aliases = set()
+        for _ in range(4):
+            with replica_reads():
+                # Every read of a block uses the same replica
+                self.assertEqual(self.router.db_for_read(CustomUser), self.router.db_for_read(FriendRequest))
+                aliases.add(self.router.db_for_read(CustomUser))
+        self.assertEqual(aliases, {'replica_0', 'replica_1'})
+
+    def test_least_latency_prefers_fastest_replica(self):
+        with patch('SocialCore.db.routers.selector', ReplicaSelector()) as selector:
+            selector.record('replica_0', 0.050)
+            selector.record('replica_1', 0.005)
+            with override_settings(REPLICA_SELECTION='least_latency'), replica_reads():
+                self.assertEqual(self.router.db_for_read(CustomUser), 'replica_1')
+
+    def test_writes_use_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(CustomUser), 'default')
+
+    def test_pin_after_write(self):
+        pin_to_primary(1, 2)
+        self.assertTrue(is_pinned_to_primary(1))
+        self.assertTrue(is_pinned_to_primary(2))
+        self.assertFalse(is_pinned_to_primary(3))
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('owner@example.com', first_name='Owner')
+        self.admin = CustomUser.objects.create_user('admin@example.com', is_staff=True)
+        self.client = APIClient()
+        registry.clear()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_records_requests_per_url_name(self):
+        self.authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('user-search'), {'keyword': 'own'})
+        metrics = registry.snapshot()['user-search']
+        self.assertEqual(metrics['duration_seconds']['count'], 1)
+        self.assertEqual(metrics['queries']['sum'], len(queries))
+        self.assertGreater(metrics['db_seconds']['sum'], 0)
+        self.assertGreater(metrics['auth_seconds']['sum'], 0)
+        self.assertGreater(metrics['serialize_seconds']['sum'], 0)
+        self.assertGreater(metrics['render_seconds']['sum'], 0)
+        self.assertIn('SELECT', metrics['slowest_sql']['sql'])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        self.authenticate(self.user)
+        self.client.get(reverse('user-search'), {'keyword': 'own'})
+        self.assertEqual(registry.snapshot(), {})
+
+    def test_metrics_are_admin_only(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_prometheus_format(self):
+        self.authenticate(self.user)
+        self.client.get(reverse('user-search'), {'keyword': 'own'})
+        self.authenticate(self.admin)
+        self.assertIn('user-search', self.client.get(reverse('metrics')).data['requests'])
+
+        response = self.client.get(reverse('metrics'), {'format': 'prometheus'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE socialcore_request_duration_seconds histogram', body)
+        self.assertIn('socialcore_request_queries_bucket{url_name="user-search",le="+Inf"} 1', body)
+        self.assertIn('socialcore_user_cache_hits ', body)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=1e-9)
+class SlowQueryCaptureTests(TestCase):
+
+    def setUp(self):
+        # Keep the captures out of the log file
+        logger_patcher = patch('SocialCore.profiling.logger')
+        self.logger = logger_patcher.start()
+        self.addCleanup(logger_patcher.stop)
+        self.user = CustomUser.objects.create_user('owner@example.com', first_name='Owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        slow_query_log.clear()
+        self.logger.reset_mock()
+
+    def test_captures_query_with_origin_and_plan(self):
+        self.client.get(reverse('user-search'), {'keyword': 'own'})
+        entries = slow_query_log.entries()
+        self.assertTrue(entries)
+        self.assertEqual(self.logger.info.call_count, len(entries))
+        search = next(entry for entry in entries if entry['origin'].startswith('UserSearchView.'))
+        self.assertIn('SELECT', search['sql'])
+        self.assertIsInstance(search['explain'], list)
+        self.assertTrue(search['explain'])
+        self.assertTrue(search['stack'][0].startswith('SocialCore/views/user_search_views.py:'))
+
+    def test_writes_are_not_explained(self):
+        FriendRequest.objects.create(from_user=self.user, to_user=CustomUser.objects.create_user('other@example.com'))
+        inserts = [entry for entry in slow_query_log.entries() if entry['sql'].startswith('INSERT')]
+        self.assertTrue(inserts)
+        self.assertTrue(all(entry['explain'] is None for entry in inserts))
+
+    def test_ignores_queries_outside_socialcore(self):
+        from django.contrib.sessions.models import Session
+
+        list(Session.objects.all())
+        self.assertFalse([entry for entry in slow_query_log.entries() if 'django_session' in entry['sql']])
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_disabled(self):
+        self.client.get(reverse('user-search'), {'keyword': 'own'})
+        self.assertEqual(slow_query_log.entries(), [])
+
+
+class FastJSONTests(TestCase):
+    data = {
+        'text': 'Chloé \u2028 "quoted" \x00',
+        'when': timezone.now(),
+        'date': timezone.now().date(),
+        'amount': Decimal('12.50'),
+        'id': uuid.UUID(int=1),
+        1: [1.5, None, True, (2, 3)],
+        'nested': {'results': [{'id': 1}, {'id': 2}]},
+    }
+
+    def backends(self):
+        yield False
+        if orjson is not None:
+            yield True
+
+    def renderer(self, use_orjson):
+        renderer = FastJSONRenderer()
+        renderer.use_orjson = use_orjson
+        return renderer
+
+    def test_matches_drf_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        for use_orjson in self.backends():
+            with self.subTest(use_orjson=use_orjson):
+                self.assertEqual(self.renderer(use_orjson).render(self.data), expected)
+
+    def test_floats_are_equivalent(self):
+        data = {'values': [0.1, 1.5, 1e16, 1e-7, -2.5e300]}
+        expected = JSONRenderer().render(data)
+        for use_orjson in self.backends():
+            with self.subTest(use_orjson=use_orjson):
+                content = self.renderer(use_orjson).render(data)
+                self.assertEqual(json.loads(content), json.loads(expected))
+                if use_orjson:
+                    # orjson writes exponents without a plus sign or leading zeros
+                    self.assertEqual(content, b'{"values":[0.1,1.5,1e16,1e-7,-2.5e300]}')
+                else:
+                    self.assertEqual(content, expected)
+
+    def test_embeds_fragments(self):
+        data = {'cached': JSONFragment('{"id":1,"tags":["a"]}'), 'list': [JSONFragment(b'[]'), 2]}
+        for use_orjson in self.backends():
+            with self.subTest(use_orjson=use_orjson):
+                self.assertEqual(self.renderer(use_orjson).render(data), b'{"cached":{"id":1,"tags":["a"]},"list":[[],2]}')
+
+    def test_parser_matches_drf_parser(self):
+        body = JSONRenderer().render({'email': 'Chloé@example.com', 'ids': [1, 2], 'nested': {'a': None}})
+        for use_orjson in self.backends():
+            with self.subTest(use_orjson=use_orjson):
+                parser = FastJSONParser()
+                parser.use_orjson = use_orjson
+                self.assertEqual(parser.parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+                with self.assertRaises(ParseError):
+                    parser.parse(BytesIO(b'{"email": NaN}'))
+
+    def test_endpoint_responses_match_drf_renderer(self):
+        user = CustomUser.objects.create_user('owner@example.com', first_name='Owner')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse('user-search'), {'keyword': 'own'})
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(response.data['results'][0]['email'], 'owner@example.com')
+
+
+class ValuesSerializerParityTests(TestCase):
+    """
+    `ValuesSerializer` output renders to the same bytes as the `ModelSerializer` it replaces.
+    """
+
+    def setUp(self):
+        names = [('Chloé', 'Müller'), ('', ''), ('Ana', "O'Brien \u2028"), ('Dmitri', 'Ng')]
+        self.users = [
+            CustomUser.objects.create_user(f'member{i}@example.com', first_name=first, last_name=last)
+            for i, (first, last) in enumerate(names)
+        ]
+        for i, status_value in enumerate(['pending', 'accepted', 'rejected']):
+            FriendRequest.objects.create(from_user=self.users[i], to_user=self.users[i + 1], status=status_value)
+        Friendship.create_pair(self.users[0].id, self.users[2].id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[1])
+
+    def assertSameOutput(self, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        values_serializer = ValuesSerializer(serializer_class)
+        self.assertEqual(JSONRenderer().render(values_serializer.serialize(values_serializer.values(queryset))), expected)
+
+    def test_user_serializers(self):
+        for serializer_class in (UserSerializer, UserSignupSerializer):
+            with self.subTest(serializer_class=serializer_class.__name__):
+                self.assertSameOutput(serializer_class, CustomUser.objects.order_by('id'))
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_friend_request_list_serializer(self):
+        queryset = FriendRequestListSerializer.setup_eager_loading(FriendRequest.objects.order_by('id'))
+        self.assertSameOutput(FriendRequestListSerializer, queryset)
+
+    def test_endpoints(self):
+        pending = FriendRequestListSerializer.setup_eager_loading(
+            FriendRequest.objects.filter(to_user=self.users[1], status='pending')
+        )
+        response = self.client.get(reverse('friend-request-list'), {'status': 'pending'})
+        self.assertEqual(
+            JSONRenderer().render(response.data['results']),
+            JSONRenderer().render(FriendRequestListSerializer(pending, many=True).data),
+        )
+        response = self.client.get(reverse('user-search'), {'keyword': 'member', 'pagination': 'cursor'})
+        self.assertEqual(
+            JSONRenderer().render(response.data['results']),
+            JSONRenderer().render(UserSignupSerializer(CustomUser.objects.order_by('id'), many=True).data),
+        )
+
+    def test_rejects_fields_without_column(self):
+        class ComputedSerializer(serializers.ModelSerializer):
+            name = serializers.SerializerMethodField()
+
+            class Meta:
+                model = CustomUser
+                fields = ['id', 'name']
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(ComputedSerializer).columns
 
-# Create your tests here.
@@ -1,14 +1,34 @@
 from django.urls import path
-from .views.authentication_views import UserSignupView, UserLoginView  
-from .views.user_search_views import UserSearchView
-from .views.friend_requests_views import FriendRequestCreateView, FriendRequestActionView,FriendListView
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views.authentication_views import UserSignupView, UserLoginView, UserLogoutView
+from .views.user_search_views import UserProfileView, UserSearchView
+from .views.async_views import (
+    AsyncUserLoginView, AsyncUserSearchView, AsyncFriendListView, AsyncFriendRequestCreateView, AsyncFriendRequestActionView,
+)
+from .views.friend_suggestions_views import FriendSuggestionView
+from .views.metrics_views import MetricsView
+from .views.friend_requests_views import FriendRequestCreateView, FriendRequestBulkCreateView, FriendRequestActionView, FriendRequestBulkActionView,FriendListView
 
 urlpatterns = [
     path('signup/', UserSignupView.as_view(), name='user-signup'),
     path('login/', UserLoginView.as_view(), name='user-login'),
+    path('logout/', UserLogoutView.as_view(), name='user-logout'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('users/me/', UserProfileView.as_view(), name='user-profile'),
     path('users/search/', UserSearchView.as_view(), name='user-search'),
     path('friend-request/send/', FriendRequestCreateView.as_view(), name='friend-request-send'),
+    path('friend-request/send/bulk/', FriendRequestBulkCreateView.as_view(), name='friend-request-send-bulk'),
     path('friend-request/action/<int:friend_request_id>/', FriendRequestActionView.as_view(), name='friend-request-action'),
+    path('friend-request/action/bulk/', FriendRequestBulkActionView.as_view(), name='friend-request-action-bulk'),
     path('friend-request/list/', FriendListView.as_view(), name='friend-request-list'),
+    path('friends/suggestions/', FriendSuggestionView.as_view(), name='friend-suggestions'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
+    # Async versions of the views above, for deployment under an ASGI server
+    path('async/login/', AsyncUserLoginView.as_view(), name='async-user-login'),
+    path('async/users/search/', AsyncUserSearchView.as_view(), name='async-user-search'),
+    path('async/friend-request/send/', AsyncFriendRequestCreateView.as_view(), name='async-friend-request-send'),
+    path('async/friend-request/action/<int:friend_request_id>/', AsyncFriendRequestActionView.as_view(), name='async-friend-request-action'),
+    path('async/friend-request/list/', AsyncFriendListView.as_view(), name='async-friend-request-list'),
 
 ]
@@ -0,0 +1,233 @@
+"""
+Async counterparts of the login, search, friend list and friend request views.
+
+DRF views are synchronous, so these are plain Django async views that reuse
+DRF's parsers, JWT authentication and serializers, and render responses with
+the default JSON renderer so their bodies match the sync endpoints. Reads use the
+async ORM; multi-statement writes that need a transaction run through
+`sync_to_async`. Under an ASGI server a slow query then suspends the request
+instead of pinning a worker.
+"""
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage, Paginator
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, serializers, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..authentication import CachedJWTAuthentication
+from ..caching import friend_list_cache
+from ..hashers import acheck_user_password
+from ..db.routers import is_pinned_to_primary, pin_to_primary, replica_reads
+from ..models import FriendRequest
+from ..renderers import FastJSONRenderer
+from ..search import search_users
+from ..serializers import (
+    FriendRequestActionSerializer, FriendRequestListSerializer, FriendRequestSerializer, UserCredentialsSerializer,
+    UserLoginSerializer, UserSerializer, UserSignupSerializer, ValuesSerializer,
+)
+from .friend_requests_views import FriendListPagination
+from .user_search_views import UserSearchPagination
+
+User = get_user_model()
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """
+    Returns a JSON response rendered exactly like DRF's default renderer.
+    """
+    return HttpResponse(FastJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+async def paginate(request, queryset, pagination_class, serializer_class):
+    """
+    Returns one page of `queryset` in the format of DRF's `PageNumberPagination`.
+
+    The page number is validated against the row count without loading any
+    rows; then only the rows of the requested page are fetched.
+
+    Args:
+        request (Request): The DRF request carrying the pagination query parameters.
+        queryset (QuerySet): The ordered queryset to paginate.
+        pagination_class (type): A `PageNumberPagination` subclass giving the page size settings.
+        serializer_class (type): `ModelSerializer` whose output the rows are given, through `ValuesSerializer`.
+
+    Returns:
+        dict: The paginated response data, with 'count', 'next', 'previous' and 'results'.
+
+    Raises:
+        NotFound: If the page number is invalid.
+    """
+    pagination = pagination_class()
+    pagination.request = request
+    paginator = Paginator(range(await queryset.acount()), pagination.get_page_size(request))
+    try:
+        pagination.page = paginator.page(request.query_params.get(pagination.page_query_param) or 1)
+    except InvalidPage:
+        raise exceptions.NotFound(pagination.invalid_page_message.format(page_number='', message=''))
+    bounds = pagination.page.object_list
+    values_serializer = ValuesSerializer.for_serializer(serializer_class)
+    rows = [row async for row in values_serializer.values(queryset)[bounds.start:bounds.stop]]
+    return pagination.get_paginated_response(values_serializer.serialize(rows)).data
+
+
+async def reads_for(user):
+    """
+    Returns a context manager routing reads to a replica, unless the user is pinned to the primary.
+    """
+    if await sync_to_async(is_pinned_to_primary)(user.pk):
+        return nullcontext()
+    return replica_reads()
+
+
+class AsyncAPIView(View):
+    """
+    Base async view requiring JWT authentication.
+
+    Wraps the Django request in a DRF `Request`, authenticates it before
+    calling the handler (unless `authentication_required` is False) and turns
+    DRF API exceptions into JSON error responses.
+    """
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    authentication_classes = [CachedJWTAuthentication]
+    authentication_required = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like DRF's APIView: JWTs are not sent by the browser automatically, so CSRF checks do not apply
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[authenticator() for authenticator in self.authentication_classes],
+        )
+        try:
+            if self.authentication_required:
+                user = await sync_to_async(lambda: request.user)()
+                if not user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = render(exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}, exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response.status_code = status.HTTP_401_UNAUTHORIZED
+                response['WWW-Authenticate'] = self.authentication_classes[0]().authenticate_header(request)
+            return response
+
+
+class AsyncUserLoginView(AsyncAPIView):
+    """
+    Async version of `UserLoginView`.
+
+    The password is verified off the event loop, in the password verifier
+    processes when they are configured.
+    """
+    authentication_required = False
+
+    async def post(self, request):
+        serializer = UserCredentialsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = await UserLoginSerializer.get_user_queryset(serializer.validated_data['email']).afirst()
+        if not (user and await acheck_user_password(user, serializer.validated_data['password'])):
+            raise serializers.ValidationError({'non_field_errors': ["Invalid email or password"]})
+        refresh = RefreshToken.for_user(user)
+        return render({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        })
+
+
+class AsyncUserSearchView(AsyncAPIView):
+    """
+    Async version of `UserSearchView`, with page number pagination.
+    """
+
+    async def get(self, request):
+        keyword = request.query_params.get("keyword", '').strip()
+        queryset = search_users(keyword) if keyword else User.objects.none()
+        with await reads_for(request.user):
+            return render(await paginate(request, queryset, UserSearchPagination, UserSignupSerializer))
+
+
+class AsyncFriendListView(AsyncAPIView):
+    """
+    Async version of `FriendListView`, with page number pagination.
+    """
+
+    async def get(self, request):
+        user = request.user
+        status_param = request.query_params.get('status', 'accepted')
+
+        if status_param == 'accepted':
+            content, cache_key = await sync_to_async(friend_list_cache.get)(request)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+            queryset = User.objects.filter(friend_of__user=user).only(*UserSerializer.Meta.fields).order_by('id')
+            serializer_class = UserSerializer
+        elif status_param == 'pending':
+            queryset = FriendRequestListSerializer.setup_eager_loading(
+                FriendRequest.objects.filter(to_user=user, status='pending').order_by('id')
+            )
+            serializer_class = FriendRequestListSerializer
+        else:
+            return render({"message": "Invalid status parameter."}, status.HTTP_400_BAD_REQUEST)
+
+        with await reads_for(user):
+            data = await paginate(request, queryset, FriendListPagination, serializer_class)
+        if not data['results']:
+            message = "No friends found." if status_param == 'accepted' else "No pending requests found."
+            return render({"message": message}, status.HTTP_404_NOT_FOUND)
+
+        response = render(data)
+        if status_param == 'accepted':
+            await sync_to_async(friend_list_cache.set)(cache_key, response.content)
+        return response
+
+
+class AsyncFriendRequestCreateView(AsyncAPIView):
+    """
+    Async version of `FriendRequestCreateView`.
+    """
+
+    async def post(self, request):
+        return await sync_to_async(self.create)(request)
+
+    def create(self, request):
+        serializer = FriendRequestSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        if not FriendRequest.can_send_request(request.user):
+            raise serializers.ValidationError("You can only send up to 3 friend requests per minute.")
+        friend_request = serializer.save(from_user=request.user)
+        pin_to_primary(request.user.pk, friend_request.to_user_id)
+        return render(serializer.data, status.HTTP_201_CREATED)
+
+
+class AsyncFriendRequestActionView(AsyncAPIView):
+    """
+    Async version of `FriendRequestActionView`.
+    """
+
+    async def patch(self, request, friend_request_id):
+        serializer = FriendRequestActionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        action_status = serializer.validated_data['status']
+        from_user_id = await sync_to_async(FriendRequest.respond)(friend_request_id, request.user, action_status)
+
+        if from_user_id is None:
+            to_user_id = await FriendRequest.objects.filter(id=friend_request_id, status='pending').values_list('to_user_id', flat=True).afirst()
+            if to_user_id is None:
+                return render({'error': 'Friend request not found or already acted upon.'}, status.HTTP_404_NOT_FOUND)
+            return render({'error': 'You do not have permission to perform this action.'}, status.HTTP_403_FORBIDDEN)
+
+        await sync_to_async(pin_to_primary)(from_user_id, request.user.pk)
+        return render({'message': f'Friend request {action_status} successfully.'})
@@ -1,9 +1,12 @@
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from ..serializers import UserSignupSerializer, UserLoginSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from ..serializers import UserSignupSerializer, UserLoginSerializer, UserLogoutSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
+from ..db.routers import pin_to_primary
+from ..revocation import revocation_list
+from rest_framework_simplejwt.settings import api_settings
 
 
 class UserSignupView(generics.CreateAPIView):
@@ -37,6 +40,7 @@ class UserSignupView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        pin_to_primary(user.pk)
         return Response({"detail": "User created successfully"}, status=status.HTTP_201_CREATED)
 
 class UserLoginView(generics.GenericAPIView):
@@ -75,3 +79,36 @@ class UserLoginView(generics.GenericAPIView):
             'refresh': str(refresh),
             'access': str(refresh.access_token),
         })
+
+
+class UserLogoutView(generics.GenericAPIView):
+    """
+    View for handling user logout requests.
+
+    Requires authentication. Revokes the given refresh token and the access
+    token of the request, so neither can be used again.
+
+    Methods:
+        post(request): Handles POST requests for user logout.
+                       Returns a success message if the tokens are revoked.
+    """
+    serializer_class = UserLogoutSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Handle the POST request for user logout.
+
+        Args:
+            request: The HTTP request object containing the refresh token.
+
+        Returns:
+            Response: A success message and HTTP 200 status if the tokens are revoked,
+                      otherwise raises a validation error.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        for token in (serializer.validated_data['refresh'], request.auth):
+            if token is not None:
+                revocation_list.revoke(token[api_settings.JTI_CLAIM], token['exp'])
+        return Response({"detail": "Logged out successfully"}, status=status.HTTP_200_OK)
@@ -4,10 +4,20 @@ from rest_framework import serializers
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
-from django.db.models import Q
+from rest_framework.pagination import PageNumberPagination
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
 
 from ..models import FriendRequest
-from ..serializers import UserSerializer,FriendRequestSerializer, FriendRequestActionSerializer,FriendRequestListSerializer
+from ..pagination import PaginationModeMixin
+from ..db.routers import pin_to_primary
+from ..ratelimit import get_rate_limit
+from ..caching import friend_list_cache
+from ..renderers import FastJSONRenderer
+from .mixins import ReplicaReadMixin
+from ..serializers import UserSerializer,FriendRequestSerializer, FriendRequestActionSerializer,FriendRequestListSerializer, FriendRequestBulkSerializer, FriendRequestBulkActionSerializer, ValuesSerializer
+
+User = get_user_model()
 
 
 class FriendRequestCreateView(generics.CreateAPIView):
@@ -35,7 +45,69 @@ class FriendRequestCreateView(generics.CreateAPIView):
         from_user = self.request.user
         if not FriendRequest.can_send_request(from_user):
             raise serializers.ValidationError("You can only send up to 3 friend requests per minute.")
-        serializer.save(from_user=from_user)
+        friend_request = serializer.save(from_user=from_user)
+        pin_to_primary(from_user.pk, friend_request.to_user_id)
+
+
+class FriendRequestBulkCreateView(APIView):
+    """
+    View to send friend requests to several users at once.
+
+    Expects a POST request with a 'to_users' list of user IDs. Every request
+    of the batch counts against the 'friend_request_bulk' rate limit, and the
+    batch is validated with a fixed number of queries, regardless of its size.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = FriendRequestBulkSerializer
+
+    def post(self, request):
+        """
+        Handle a batch of friend requests with a POST request.
+
+        Args:
+            request (Request): The HTTP request object.
+
+        Returns:
+            Response: The result for every requested user, in request order, and the number of requests sent.
+        """
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        from_user = request.user
+        to_user_ids = list(dict.fromkeys(serializer.validated_data['to_users']))  # Drop repeated IDs, keep order
+        existing_ids = set(User.objects.filter(id__in=to_user_ids).values_list('id', flat=True))
+        already_sent_ids = set(
+            FriendRequest.objects.filter(from_user=from_user, to_user_id__in=to_user_ids, status='pending')
+            .values_list('to_user_id', flat=True)
+        )
+
+        results = []
+        valid_ids = []
+        for to_user_id in to_user_ids:
+            if to_user_id not in existing_ids:
+                error = 'User not found.'
+            elif to_user_id == from_user.pk:
+                error = 'Cannot send a friend request to yourself.'
+            elif to_user_id in already_sent_ids:
+                error = 'Friend request already sent to this user.'
+            else:
+                valid_ids.append(to_user_id)
+                results.append({'to_user': to_user_id, 'status': 'sent'})
+                continue
+            results.append({'to_user': to_user_id, 'status': 'failed', 'error': error})
+
+        if valid_ids:
+            if not FriendRequest.can_send_request(from_user, count=len(valid_ids), action='friend_request_bulk'):
+                rate = get_rate_limit('friend_request_bulk')
+                return Response(
+                    [f"You can only send up to {rate['limit']} friend requests per {rate['window']} seconds in batches."],
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            FriendRequest.send_many(from_user, valid_ids)
+            pin_to_primary(from_user.pk, *valid_ids)
+
+        return Response({'sent': len(valid_ids), 'results': results}, status=status.HTTP_200_OK)
 
 
 class FriendRequestActionView(APIView):
@@ -43,7 +115,7 @@ class FriendRequestActionView(APIView):
     View to accept or reject a friend request.
 
     Expects a PATCH request with a 'status' parameter (either 'accepted' or 'rejected')
-    in the form-data.
+    in the form-data. Concurrent actions on the same request are safe: exactly one of them succeeds.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = FriendRequestActionSerializer
@@ -59,16 +131,6 @@ class FriendRequestActionView(APIView):
         Returns:
             Response: A response indicating success or failure of the operation.
         """
-        # Retrieve the friend request by ID
-        try:
-            friend_request = FriendRequest.objects.get(id=friend_request_id, status='pending')
-        except FriendRequest.DoesNotExist:
-            return Response({'error': 'Friend request not found or already acted upon.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Check that the request user is the 'to_user'
-        if friend_request.to_user != request.user:
-            return Response({'error': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN)
-
         # Validate and get the status from the request body using the serializer
         serializer = self.serializer_class(data=request.data)
         if not serializer.is_valid():
@@ -76,24 +138,85 @@ class FriendRequestActionView(APIView):
         
         action_status = serializer.validated_data['status']
 
-        # Check if the friend request is already in the desired state
-        if friend_request.status == action_status:
-            return Response({'message': f'Friend request is already {action_status}.'}, status=status.HTTP_200_OK)
+        # Update the friend request in a single conditional UPDATE
+        from_user_id = FriendRequest.respond(friend_request_id, request.user, action_status)
+
+        # Only on a miss, find out why the request could not be updated
+        if from_user_id is None:
+            to_user_id = FriendRequest.objects.filter(id=friend_request_id, status='pending').values_list('to_user_id', flat=True).first()
+            if to_user_id is None:
+                return Response({'error': 'Friend request not found or already acted upon.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'error': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Update the friend request status
-        friend_request.status = action_status
-        friend_request.save()
+        pin_to_primary(from_user_id, request.user.pk)
 
         return Response({'message': f'Friend request {action_status} successfully.'}, status=status.HTTP_200_OK)
 
 
-class FriendListView(generics.ListAPIView):
+class FriendRequestBulkActionView(APIView):
+    """
+    View to accept or reject several received friend requests at once.
+
+    Expects a PATCH request with a 'status' parameter (either 'accepted' or 'rejected')
+    and either an 'ids' list or a 'before' timestamp selecting the pending requests.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = FriendRequestBulkActionSerializer
+
+    def patch(self, request):
+        """
+        Handle a batch of friend request actions with a PATCH request.
+
+        Args:
+            request (Request): The HTTP request object.
+
+        Returns:
+            Response: The number of updated requests and the IDs that could not be updated.
+        """
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        action_status = serializer.validated_data['status']
+        ids = serializer.validated_data.get('ids')
+        senders = FriendRequest.respond_many(
+            request.user, action_status, ids=ids, before=serializer.validated_data.get('before')
+        )
+        if senders:
+            pin_to_primary(request.user.pk, *senders.values())
+
+        failed = []
+        missed_ids = [friend_request_id for friend_request_id in dict.fromkeys(ids or []) if friend_request_id not in senders]
+        if missed_ids:
+            # Pending requests that were not updated belong to someone else
+            others_pending = set(FriendRequest.objects.filter(id__in=missed_ids, status='pending').values_list('id', flat=True))
+            for friend_request_id in missed_ids:
+                if friend_request_id in others_pending:
+                    error = 'You do not have permission to perform this action.'
+                else:
+                    error = 'Friend request not found or already acted upon.'
+                failed.append({'id': friend_request_id, 'error': error})
+
+        return Response({'status': action_status, 'updated': len(senders), 'failed': failed}, status=status.HTTP_200_OK)
+
+
+class FriendListPagination(PageNumberPagination):
+    page_size = 10  # Set the number of records per page
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class FriendListView(ReplicaReadMixin, PaginationModeMixin, generics.ListAPIView):
     """
     View to list all friends or pending friend requests of the authenticated user.
 
     Lists users who have accepted friend requests or pending requests based on the status query parameter.
+    Results are paginated by page number, or by cursor with `?pagination=cursor`.
+    Reads are served from a read replica when replicas are configured.
+    Rendered pages of the accepted list are cached until the user's friendships change.
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = FriendListPagination
 
     def get_serializer_class(self):
         """
@@ -110,6 +233,9 @@ class FriendListView(generics.ListAPIView):
     def get_queryset(self):
         """
         Retrieves the queryset of friends or pending friend requests for the authenticated user.
+
+        Friends are read from the `Friendship` edge table, so the accepted list is a
+        single indexed query on (user, friend) rather than a scan of friend requests.
         
         Returns:
             QuerySet: Filtered queryset based on the status query parameter.
@@ -118,20 +244,11 @@ class FriendListView(generics.ListAPIView):
         status_param = self.request.query_params.get('status', 'accepted')
 
         if status_param == 'accepted':
-            accepted_requests = FriendRequest.objects.filter(
-                Q(from_user=user, status='accepted') | Q(to_user=user, status='accepted')
-            )
-            friends = set()
-            for request in accepted_requests:
-                if request.from_user == user:
-                    friends.add(request.to_user)
-                else:
-                    friends.add(request.from_user)
-            return friends  # Used set here to avoid duplicates
+            return User.objects.filter(friend_of__user=user).only(*UserSerializer.Meta.fields).order_by('id')
 
         elif status_param == 'pending':
-            pending_requests = FriendRequest.objects.filter(to_user=user, status='pending')
-            return pending_requests
+            pending_requests = FriendRequest.objects.filter(to_user=user, status='pending').order_by('id')
+            return FriendRequestListSerializer.setup_eager_loading(pending_requests)
         
         else:
             return FriendRequest.objects.none()  # or raises an exception if status is invalid
@@ -141,17 +258,29 @@ class FriendListView(generics.ListAPIView):
         Handles the GET request to list friends or pending friend requests.
 
         Returns:
-            Response: Serialized data or custom message if no data is found.
+            Response: Paginated serialized data or custom message if no data is found.
         """
-        queryset = self.get_queryset()
-        if not queryset:
-            status_param = self.request.query_params.get('status', 'accepted')
+        status_param = self.request.query_params.get('status', 'accepted')
+        cache_key = None
+        if status_param == 'accepted':
+            content, cache_key = friend_list_cache.get(request)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+
+        if status_param not in ('accepted', 'pending'):
+            return Response({"message": "Invalid status parameter."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Rows are serialized straight from `.values()`, with the output of the serializer class
+        values_serializer = ValuesSerializer.for_serializer(self.get_serializer_class())
+        page = self.paginate_queryset(values_serializer.values(self.get_queryset()))
+        if not page:
             if status_param == 'accepted':
                 return Response({"message": "No friends found."}, status=status.HTTP_404_NOT_FOUND)
-            elif status_param == 'pending':
-                return Response({"message": "No pending requests found."}, status=status.HTTP_404_NOT_FOUND)
-            else:
-                return Response({"message": "Invalid status parameter."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            return Response({"message": "No pending requests found."}, status=status.HTTP_404_NOT_FOUND)
+
+        response = self.get_paginated_response(values_serializer.serialize(page))
+        if status_param == 'accepted':
+            content = FastJSONRenderer().render(response.data)
+            friend_list_cache.set(cache_key, content)
+            return HttpResponse(content, content_type='application/json')
+        return response
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from ..models import FriendRequest
+from ..recommendations import friend_graph
+from ..serializers import UserSerializer, ValuesSerializer
+
+User = get_user_model()
+
+
+class FriendSuggestionView(generics.GenericAPIView):
+    """
+    View to suggest people the authenticated user may know.
+
+    Suggestions are friends of the user's friends, ranked by their number of
+    mutual friends. Users with a pending friend request from or to the user
+    are left out.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 100
+
+    def get(self, request):
+        """
+        Handles the GET request listing friend suggestions.
+
+        Accepts an optional 'limit' query parameter (default 10, at most 100).
+
+        Args:
+            request (Request): The HTTP request object.
+
+        Returns:
+            Response: The suggested users with their number of mutual friends, best first.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response({"message": "Invalid limit parameter."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        pending = FriendRequest.objects.filter(
+            Q(from_user=user) | Q(to_user=user), status='pending'
+        ).values_list('from_user_id', 'to_user_id')
+        excluded = {user_id for pair in pending for user_id in pair}
+
+        suggestions = friend_graph.get().suggest(user.pk, limit, exclude=excluded)
+        values_serializer = ValuesSerializer.for_serializer(UserSerializer)
+        rows = values_serializer.values(User.objects.filter(is_active=True, id__in=[user_id for user_id, _ in suggestions]))
+        users = {user['id']: user for user in values_serializer.serialize(rows)}
+        results = [
+            {**users[user_id], 'mutual_friends': mutual_friends}
+            for user_id, mutual_friends in suggestions
+            if user_id in users
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
@@ -0,0 +1,45 @@
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from ..authentication import user_cache
+from ..caching import friend_list_cache
+from ..db.pool import get_pool_stats
+from ..instrumentation import registry
+from ..profiling import slow_query_log
+from ..renderers import PrometheusRenderer
+from ..revocation import revocation_list
+
+
+class MetricsView(APIView):
+    """
+    View exposing the request instrumentation and cache stats of this process to admin users.
+
+    Responds in JSON by default, or in the Prometheus text format with
+    `?format=prometheus` or an `Accept: text/plain` header.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PrometheusRenderer]
+
+    def get(self, request):
+        """
+        Handles the GET request returning the metrics.
+
+        Args:
+            request (Request): The HTTP request object.
+
+        Returns:
+            Response: Per-URL-name histograms of sampled requests, the stats
+            of the connection pools and in-process caches, and the latest slow queries.
+        """
+        return Response({
+            'sample_rate': getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.1),
+            'requests': registry.snapshot(),
+            'db_pools': get_pool_stats(),
+            'friend_list_cache': friend_list_cache.stats(),
+            'user_cache': user_cache.stats(),
+            'token_revocation': revocation_list.stats(),
+            'slow_queries': slow_query_log.entries(),
+        })
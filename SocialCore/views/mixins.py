@@ -0,0 +1,26 @@
+from contextlib import ExitStack
+
+from django.db import connections
+
+from ..db.routers import get_replicas, is_pinned_to_primary, record_replica_latency, replica_reads
+
+
+class ReplicaReadMixin:
+    """
+    Serves the reads of an API view from a read replica.
+
+    Authentication runs against the primary. Users pinned after a recent
+    write keep reading from the primary so that they see their own changes.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._replica_stack = ExitStack()
+        if get_replicas() and not is_pinned_to_primary(request.user.pk):
+            alias = self._replica_stack.enter_context(replica_reads())
+            self._replica_stack.enter_context(connections[alias].execute_wrapper(record_replica_latency(alias)))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if hasattr(self, '_replica_stack'):
+            self._replica_stack.close()
+        return super().finalize_response(request, response, *args, **kwargs)
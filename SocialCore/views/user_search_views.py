@@ -1,9 +1,11 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
-from ..serializers import UserSignupSerializer
+from ..serializers import UserProfileSerializer, UserSignupSerializer, ValuesSerializer
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from ..search import search_users
+from ..pagination import PaginationModeMixin
+from .mixins import ReplicaReadMixin
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -14,9 +16,13 @@ class UserSearchPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class UserSearchView(generics.ListAPIView):
+class UserSearchView(ReplicaReadMixin, PaginationModeMixin, generics.ListAPIView):
     """
     Searches for users based on the provided search keyword.
+
+    Reads are served from a read replica when replicas are configured.
+
+    Results are paginated by page number, or by cursor with `?pagination=cursor`.
     """
     serializer_class = UserSignupSerializer
     permission_classes = [IsAuthenticated]
@@ -25,18 +31,27 @@ class UserSearchView(generics.ListAPIView):
     def get(self, request):
         keyword = request.query_params.get("keyword", '').strip()
         if keyword:
-            queryset = User.objects.filter(
-                Q(email__icontains=keyword) | 
-                Q(first_name__icontains=keyword) | 
-                Q(last_name__icontains=keyword)
-            )  # Search by email, first name, or last name
+            queryset = search_users(keyword)  # Search by email, first name, or last name
         else:
             queryset = User.objects.none()
 
-        page = self.paginate_queryset(queryset)
+        # Rows are serialized straight from `.values()`, with the output of `serializer_class`
+        values_serializer = ValuesSerializer.for_serializer(self.get_serializer_class())
+        rows = values_serializer.values(queryset)
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(values_serializer.serialize(page))
+
+        return Response(values_serializer.serialize(rows), status=status.HTTP_200_OK)
+
+
+class UserProfileView(generics.RetrieveAPIView):
+    """
+    Returns the profile of the authenticated user, with their friend and pending request counts.
+    """
+    serializer_class = UserProfileSerializer
+    permission_classes = [IsAuthenticated]
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def get_object(self):
+        # The authenticated user may come from the authentication cache, with older counters
+        return User.objects.only(*self.serializer_class.Meta.fields).get(pk=self.request.user.pk)
@@ -12,8 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
-from decouple import config  
+from decouple import config, Csv
 import os
+import tempfile
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'SocialCore.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,17 +81,125 @@ WSGI_APPLICATION = 'social_connect.wsgi.application'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 
+# Set DB_ENGINE=SocialCore.db.backends.mysql to check connections out of an
+# in-process pool (sized by the DB_POOL_* variables) instead of keeping one
+# persistent connection per worker thread. With the pool, set DB_CONN_MAX_AGE=0
+# so connections go back to the pool at the end of every request.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.mysql'),
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='127.0.0.1'),
         'PORT': config('DB_PORT', default='3306'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'POOL': {
+            'SIZE': config('DB_POOL_SIZE', default=5, cast=int),
+            'MAX_OVERFLOW': config('DB_POOL_MAX_OVERFLOW', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=30, cast=float),
+            'RECYCLE': config('DB_POOL_RECYCLE', default=3600, cast=int),
+        },
     }
 }
 
+# Read replicas, given as a comma-separated list of "host" or "host:port".
+# They share the primary's credentials and database name.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv())):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['SocialCore.db.routers.ReplicaRouter']
+
+# 'round_robin' or 'least_latency'
+REPLICA_SELECTION = config('DB_REPLICA_SELECTION', default='round_robin')
+
+# How long users read from the primary after writing, to see their own changes
+REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='social-connect'),
+    },
+    # State every worker must see, such as token revocations. Its add and incr
+    # must be atomic: the default is a file cache on this host that locks them;
+    # use Memcached or Redis when workers run on several hosts.
+    'shared': {
+        'BACKEND': config('SHARED_CACHE_BACKEND', default='SocialCore.cache_backends.AtomicFileBasedCache'),
+        'LOCATION': config('SHARED_CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'social-connect-shared')),
+    },
+}
+
+# Rate limits per action; 'window' is in seconds.
+# RATE_LIMIT_CACHE names the cache holding the counters, so that checking a
+# limit does not query the database. It must be shared by all workers, with an
+# atomic incr (the 'shared' cache); a LocMemCache limits each worker
+# separately. Empty counts the user's recent rows in the database instead.
+RATE_LIMIT_CACHE = config('RATE_LIMIT_CACHE', default='shared')
+
+# Batches sent to /friend-request/send/bulk/ count against their own limit,
+# which also caps the size of a single batch. The database fallback counts
+# each request under the action stored on its row, so both paths keep single
+# and batched requests apart.
+RATE_LIMITS = {
+    'friend_request': {'limit': 3, 'window': 60},
+    'friend_request_bulk': {'limit': 100, 'window': 60},
+}
+
+# Cache holding rendered friend lists, or empty to disable it.
+# Entries are invalidated when friendships change and expire after the timeout (seconds).
+FRIEND_LIST_CACHE = config('FRIEND_LIST_CACHE', default='default')
+FRIEND_LIST_CACHE_TIMEOUT = config('FRIEND_LIST_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds before the in-process friend graph used for friend suggestions is
+# rebuilt from the database, in the background. Friendships accepted and users
+# deleted in this process are applied to it immediately; those changed by other
+# workers appear after a rebuild.
+FRIEND_GRAPH_MAX_AGE = config('FRIEND_GRAPH_MAX_AGE', default=600, cast=int)
+
+
+# Password hashing tiers. PASSWORD_HASHER picks the tier hashing new passwords;
+# the others stay installed so existing hashes verify, and are replaced with
+# the preferred tier on the user's next login. 'argon2' needs argon2-cffi.
+PASSWORD_HASHER_TIERS = {
+    'pbkdf2': 'SocialCore.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'SocialCore.hashers.TunedScryptPasswordHasher',
+    'argon2': 'SocialCore.hashers.TunedArgon2PasswordHasher',
+}
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_TIERS[PASSWORD_HASHER]] + [
+    path for tier, path in PASSWORD_HASHER_TIERS.items() if tier != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Cost parameters of each tier, to tune for the hardware. Changing them
+# rehashes passwords on login too.
+PBKDF2_ITERATIONS = config('PBKDF2_ITERATIONS', default=870000, cast=int)
+SCRYPT_WORK_FACTOR = config('SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)
+SCRYPT_BLOCK_SIZE = config('SCRYPT_BLOCK_SIZE', default=8, cast=int)
+SCRYPT_PARALLELISM = config('SCRYPT_PARALLELISM', default=5, cast=int)
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=102400, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=8, cast=int)
+
+# Worker processes verifying passwords at login, or 0 to verify in the request thread.
+PASSWORD_VERIFIER_PROCESSES = config('PASSWORD_VERIFIER_PROCESSES', default=0, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -138,13 +248,70 @@ AUTH_USER_MODEL = 'SocialCore.CustomUser'
 # Use JWT authentication for all APIs by default
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'SocialCore.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',  # Require authentication by default
     ),
+    # Same output as DRF's JSON renderer and parser, faster with orjson installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'SocialCore.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'SocialCore.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),  #  15-minute access token lifetime
+    'TOKEN_REFRESH_SERIALIZER': 'SocialCore.serializers.RevocableTokenRefreshSerializer',
+}
+
+# Revoked token IDs are shared between workers through this cache, which must
+# be visible to all of them and have an atomic add and incr (the 'shared' cache;
+# a LocMemCache is logged as a warning); leave it empty to keep revocations in
+# the revoking process only. Workers replay new revocations at most every
+# TOKEN_REVOCATION_SYNC_INTERVAL seconds.
+TOKEN_REVOCATION_CACHE = config('TOKEN_REVOCATION_CACHE', default='shared')
+TOKEN_REVOCATION_SYNC_INTERVAL = config('TOKEN_REVOCATION_SYNC_INTERVAL', default=1.0, cast=float)
+TOKEN_REVOCATION_CAPACITY = config('TOKEN_REVOCATION_CAPACITY', default=100000, cast=int)
+
+# In-process cache of the user profiles used by JWT authentication: maximum
+# number of users (0 disables it) and seconds before a profile is reloaded.
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+
+# Fraction of requests whose query count, database time, authentication and
+# rendering time are recorded per URL name and served at /metrics/ (0 disables it).
+INSTRUMENTATION_SAMPLE_RATE = config('INSTRUMENTATION_SAMPLE_RATE', default=0.1, cast=float)
+
+# Queries from SocialCore code taking at least SLOW_QUERY_THRESHOLD seconds
+# (0 disables capture) are captured with their EXPLAIN output: the last
+# SLOW_QUERY_BUFFER_SIZE are served at /metrics/, and all are logged as JSON
+# lines to SLOW_QUERY_LOG_FILE (empty to disable), rotated at
+# SLOW_QUERY_LOG_MAX_BYTES with SLOW_QUERY_LOG_BACKUPS old files kept.
+SLOW_QUERY_THRESHOLD = config('SLOW_QUERY_THRESHOLD', default=0.1, cast=float)
+SLOW_QUERY_BUFFER_SIZE = config('SLOW_QUERY_BUFFER_SIZE', default=100, cast=int)
+SLOW_QUERY_LOG_FILE = config('SLOW_QUERY_LOG_FILE', default=str(BASE_DIR / 'slow_queries.log'))
+SLOW_QUERY_LOG_MAX_BYTES = config('SLOW_QUERY_LOG_MAX_BYTES', default=10 * 2 ** 20, cast=int)
+SLOW_QUERY_LOG_BACKUPS = config('SLOW_QUERY_LOG_BACKUPS', default=5, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': SLOW_QUERY_LOG_MAX_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            'delay': True,  # The file is only created once a slow query is logged
+        } if SLOW_QUERY_LOG_FILE else {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'SocialCore.profiling': {'handlers': ['slow_queries'], 'level': 'INFO', 'propagate': False},
+    },
 }